@@ -0,0 +1,65 @@
+"""Скорость нечёткого поиска FuzzyIndex на большом списке кандидатов.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_completion.py [--candidates 20000]
+
+Кандидаты — имена из builtins/os плюс синтетические идентификаторы в
+snake_case и camelCase. Печатает время построения индекса и время
+filter() для последовательности нажатий, как при наборе слова.
+"""
+import argparse
+import builtins
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.editor.fuzzy_ranker import FuzzyIndex
+
+PARTS = ('get', 'set', 'value', 'read', 'csv', 'data', 'frame', 'to', 'from',
+         'index', 'array', 'item', 'list', 'dict', 'name', 'path', 'file',
+         'load', 'save', 'is', 'has', 'count', 'max', 'min')
+TYPING = ('r', 're', 'rea', 'read', 'read_', 'read_c', 'g', 'gv', 'gvo', 'x', 'ge', 'get', 'getV')
+
+
+def candidates(count, seed=1):
+    random.seed(seed)
+    names = set(dir(builtins)) | set(dir(os))
+    while len(names) < count:
+        parts = random.sample(PARTS, random.randint(1, 4))
+        if random.random() < 0.5:
+            names.add('_'.join(parts))
+        else:
+            names.add(parts[0] + ''.join(p.title() for p in parts[1:]))
+    return list(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    names = candidates(args.candidates)
+    index = FuzzyIndex()
+    start = time.perf_counter()
+    index.set_candidates(names)
+    print(f"индекс на {len(index)} имён: {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    for query in TYPING:
+        best = None
+        for _ in range(args.repeat):
+            # Сбрасываем сужение, чтобы мерить худший случай для каждого запроса
+            index._last_query = None
+            start = time.perf_counter()
+            rows = index.filter(query)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{query!r:10} {len(rows):6} совпадений  {best * 1000:6.2f} мс")
+
+
+if __name__ == '__main__':
+    main()
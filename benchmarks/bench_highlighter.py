@@ -0,0 +1,103 @@
+"""Сравнение скорости подсветки Python: PythonTokenizer против pygments.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_highlighter.py [файлы.py ...]
+
+Без аргументов берутся несколько крупных модулей стандартной библиотеки.
+Печатает строки в секунду для разбора (без Qt) и для полной подсветки
+QTextDocument через ReliableSyntaxHighlighter.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygments.lexers import PythonLexer
+
+from src.editor.python_tokenizer import PythonTokenizer
+from src.editor.syntax_hightlighter import PygmentsEngine
+
+DEFAULT_MODULES = ('argparse', 'inspect', 'typing', 'pydoc', 'tarfile')
+
+
+def default_files():
+    import importlib
+    files = []
+    for name in DEFAULT_MODULES:
+        module = importlib.import_module(name)
+        files.append(module.__file__)
+    return files
+
+
+def bench_tokenize(engine, lines, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        state = engine.initial_state
+        for line in lines:
+            _, state = engine.tokenize(line, state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def bench_qt(make_engine, text, line_count, repeat):
+    from PyQt6.QtGui import QGuiApplication, QTextDocument
+    from src.editor.syntax_hightlighter import ReliableSyntaxHighlighter
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    best = None
+    for _ in range(repeat):
+        document = QTextDocument()
+        document.setPlainText(text)
+        highlighter = ReliableSyntaxHighlighter(document)
+        start = time.perf_counter()
+        # Мимо set_engine: нужен синхронный проход без HighlightScheduler
+        highlighter.engine = make_engine()
+        highlighter.rehighlight()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        # Отложенные события прошлого повтора — вне замера, до следующего
+        app.processEvents()
+    return line_count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-qt', action='store_true',
+                        help='не измерять подсветку QTextDocument')
+    args = parser.parse_args()
+
+    files = args.files or default_files()
+    texts = []
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            texts.append(f.read())
+    text = '\n'.join(texts)
+    lines = text.split('\n')
+    print(f"{len(files)} файлов, {len(lines)} строк")
+
+    native = bench_tokenize(PythonTokenizer(), lines, args.repeat)
+    pygments = bench_tokenize(PygmentsEngine(PythonLexer()), lines, args.repeat)
+    print(f"разбор:     PythonTokenizer {native:>10,.0f} строк/с   "
+          f"pygments {pygments:>10,.0f} строк/с   x{native / pygments:.1f}")
+
+    if args.no_qt:
+        return
+    try:
+        native = bench_qt(PythonTokenizer, text, len(lines), args.repeat)
+        pygments = bench_qt(lambda: PygmentsEngine(PythonLexer()), text, len(lines), args.repeat)
+    except ImportError:
+        print("PyQt6 не установлен — подсветка QTextDocument пропущена")
+        return
+    print(f"подсветка:  PythonTokenizer {native:>10,.0f} строк/с   "
+          f"pygments {pygments:>10,.0f} строк/с   x{native / pygments:.1f}")
+
+
+if __name__ == '__main__':
+    main()
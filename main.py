@@ -1,9 +1,15 @@
 from src.main_window.main_window import MainWindow
+from src.io_loop.io_loop import io_loop
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 """main.py"""
 if __name__ == "__main__":
+    # Форматирование идёт в spawn-процессах; в собранном exe без этого
+    # каждый дочерний процесс запустил бы ещё одно окно IDE
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    io_loop.start()
 
     window = MainWindow()
     window.show()
@@ -0,0 +1,235 @@
+# src/debugger/call_stack_tree.py
+
+import os
+from contextlib import contextmanager
+
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
+
+FIRST_PAGE = 20    # кадров сразу после остановки
+NEXT_PAGE = 200    # кадров по «load more»
+
+THREAD_ROLE = Qt.ItemDataRole.UserRole       # id потока
+FRAME_ROLE = Qt.ItemDataRole.UserRole + 1    # (id, глубина, имя, путь, строка)
+MORE_ROLE = Qt.ItemDataRole.UserRole + 2     # (id потока, startFrame)
+LOADED_ROLE = Qt.ItemDataRole.UserRole + 3
+
+
+class CallStackTree(QTreeWidget):
+    """Потоки и стек вызовов остановленной сессии.
+
+    Кадры потока запрашиваются (stackTrace с startFrame/levels) только при
+    раскрытии потока и страницами: сначала FIRST_PAGE верхних, остальные —
+    по запросу. Рекурсия в тысячи кадров не тянется целиком ни адаптером,
+    ни клиентом. Ответы кешируются сессией до того, как программа пойдёт
+    дальше.
+    """
+
+    frame_selected = pyqtSignal(int, int, tuple)  # поток, глубина, кадр
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHeaderLabels(["Call Stack", "Location"])
+        self.session = None
+        self._stopped_thread = None
+        self._expanded_threads = set()
+        self._generation = 0
+        self._selected_frame = None  # последний кадр, о котором сообщили
+        self.itemExpanded.connect(self._on_item_expanded)
+        self.itemCollapsed.connect(self._on_item_collapsed)
+        self.itemClicked.connect(self._on_item_clicked)
+        self.currentItemChanged.connect(self._on_current_item_changed)
+
+    def clear(self):
+        self._generation += 1
+        self.session = None
+        self._selected_frame = None
+        super().clear()
+
+    def show_stop(self, session, thread_id):
+        """Потоки после остановки; у остановившегося сразу выбран верхний кадр.
+
+        На следующей остановке той же сессии дерево не строится заново:
+        узлы потоков остаются, кадры раскрытых потоков перезапрашиваются и
+        обновляются на месте, так что прокрутка и раскрытие не сбиваются.
+        """
+        if session is not self.session:
+            self._expanded_threads.clear()
+            self.clear()
+            self.session = session
+        else:
+            self._generation += 1  # ответы прошлой остановки уже не нужны
+        self._stopped_thread = thread_id
+        self._request("threads", {}, self._on_threads)
+
+    def _request(self, command, arguments, handler):
+        generation = self._generation
+
+        def on_response(response):
+            if generation == self._generation and response.get("success"):
+                handler(response.get("body") or {})
+
+        self.session.request_cached(command, arguments, on_response)
+
+    def _on_threads(self, body):
+        threads = body.get("threads", [])
+        if not any(thread["id"] == self._stopped_thread for thread in threads):
+            # Адаптер мог не успеть сообщить о потоке — покажем его всё равно
+            threads.append({"id": self._stopped_thread, "name": f"Thread {self._stopped_thread}"})
+        ids = {thread["id"] for thread in threads}
+        existing = {}
+        with self._quiet():
+            for index in reversed(range(self.topLevelItemCount())):
+                thread_id = self.topLevelItem(index).data(0, THREAD_ROLE)
+                if thread_id in ids and thread_id not in existing:
+                    existing[thread_id] = self.topLevelItem(index)
+                else:
+                    self.takeTopLevelItem(index)
+
+        for index, thread in enumerate(threads):
+            name = thread.get("name", str(thread["id"]))
+            item = existing.pop(thread["id"], None)
+            if item is None:
+                item = QTreeWidgetItem([name, ""])
+                item.setData(0, THREAD_ROLE, thread["id"])
+                item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+                self.insertTopLevelItem(index, item)
+            else:
+                if self.topLevelItem(index) is not item:
+                    with self._quiet():
+                        self.takeTopLevelItem(self.indexOfTopLevelItem(item))
+                        self.insertTopLevelItem(index, item)
+                if item.text(0) != name:
+                    item.setText(0, name)
+                self._refresh(item, thread["id"])
+            if thread["id"] == self._stopped_thread or thread["id"] in self._expanded_threads:
+                item.setExpanded(True)
+
+    def _refresh(self, thread_item, thread_id):
+        # Кадры прошлой остановки: у раскрытого потока перезапрашиваем
+        # столько же, сколько было видно, свёрнутый забывает их до раскрытия
+        if not thread_item.data(0, LOADED_ROLE):
+            return
+        if thread_item.isExpanded():
+            loaded = sum(1 for i in range(thread_item.childCount())
+                         if thread_item.child(i).data(0, FRAME_ROLE) is not None)
+            self._load_frames(thread_item, thread_id, 0, max(loaded, FIRST_PAGE))
+        else:
+            with self._quiet():
+                thread_item.takeChildren()
+            thread_item.setData(0, LOADED_ROLE, False)
+
+    def _on_item_expanded(self, item):
+        thread_id = item.data(0, THREAD_ROLE)
+        if thread_id is None:
+            return
+        self._expanded_threads.add(thread_id)
+        if not item.data(0, LOADED_ROLE):
+            item.setData(0, LOADED_ROLE, True)
+            self._load_frames(item, thread_id, 0, FIRST_PAGE)
+
+    def _on_item_collapsed(self, item):
+        self._expanded_threads.discard(item.data(0, THREAD_ROLE))
+
+    def _on_item_clicked(self, item, column):
+        more = item.data(0, MORE_ROLE)
+        if more is None:
+            return
+        thread_item = item.parent()
+        with self._quiet():
+            thread_item.removeChild(item)
+        self._load_frames(thread_item, more[0], more[1], NEXT_PAGE)
+
+    def _load_frames(self, thread_item, thread_id, start, levels):
+        def on_stack_trace(body):
+            frames = body.get("stackFrames", [])
+            total = body.get("totalFrames")
+            with self._quiet():
+                if start == 0:
+                    items = self._sync_frames(thread_item, frames)
+                else:
+                    items = [_frame_item(level, frame) for level, frame in enumerate(frames, start)]
+                    thread_item.addChildren(items)
+                thread_item.setText(1, f"{total} frames" if total else "")
+                loaded = start + len(frames)
+                if len(frames) == levels and (total is None or loaded < total):
+                    more = QTreeWidgetItem(["… load more frames", ""])
+                    more.setData(0, MORE_ROLE, (thread_id, loaded))
+                    thread_item.addChild(more)
+            if start == 0 and items and thread_id == self._stopped_thread:
+                self._select(items[0])
+
+        self._request("stackTrace", {"threadId": thread_id, "startFrame": start, "levels": levels},
+                      on_stack_trace)
+
+    def _sync_frames(self, thread_item, frames):
+        """Первые кадры потока на месте прежних узлов: меняется только отличающийся текст."""
+        items = []
+        for level, frame in enumerate(frames):
+            item = thread_item.child(level)
+            if item is None or item.data(0, FRAME_ROLE) is None:
+                item = _frame_item(level, frame)
+                thread_item.insertChild(level, item)
+            else:
+                data = _frame_data(level, frame)
+                if item.text(0) != data[2]:
+                    item.setText(0, data[2])
+                location = _location(data[3], data[4])
+                if item.text(1) != location:
+                    item.setText(1, location)
+                    item.setToolTip(1, data[3])
+                item.setData(0, FRAME_ROLE, data)
+            items.append(item)
+        while thread_item.childCount() > len(frames):
+            thread_item.removeChild(thread_item.child(len(frames)))
+        return items
+
+    def _select(self, item):
+        if self.currentItem() is item:
+            # Узел тот же, но кадр уже другой — currentItemChanged не придёт
+            self._on_current_item_changed(item, item)
+        else:
+            self.setCurrentItem(item)
+
+    @contextmanager
+    def _quiet(self):
+        """Правка структуры без смены выбранного кадра.
+
+        Удаление узлов двигает текущий элемент Qt на соседний — это не
+        выбор пользователя, поэтому прежний кадр возвращается на место,
+        а сигналы на это время глушатся.
+        """
+        selected = self._selected_frame
+        blocked = self.blockSignals(True)
+        try:
+            yield
+        finally:
+            if (selected is not None and not sip.isdeleted(selected) and selected.treeWidget() is self
+                    and self.currentItem() is not selected):
+                self.setCurrentItem(selected)
+            self.blockSignals(blocked)
+
+    def _on_current_item_changed(self, current, previous):
+        frame = current.data(0, FRAME_ROLE) if current is not None else None
+        if frame is not None:
+            self._selected_frame = current
+            self.frame_selected.emit(current.parent().data(0, THREAD_ROLE), frame[1], frame)
+
+
+def _frame_data(level, frame):
+    # (id, глубина, имя, путь, строка)
+    return (frame["id"], level, frame.get("name", ""), (frame.get("source") or {}).get("path", ""),
+            frame.get("line", 0))
+
+
+def _location(path, line):
+    return f"{os.path.basename(path)}:{line}" if path else ""
+
+
+def _frame_item(level, frame):
+    data = _frame_data(level, frame)
+    item = QTreeWidgetItem([data[2], _location(data[3], data[4])])
+    item.setData(0, FRAME_ROLE, data)
+    item.setToolTip(1, data[3])
+    return item
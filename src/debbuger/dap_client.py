@@ -1,13 +1,28 @@
 # src/debugger/dap_client.py
 
 import json
-import socket
-from PyQt6.QtCore import QObject, pyqtSignal, QTimer
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QAbstractSocket, QTcpSocket
 
 
 class DapClient(QObject):
+    """Клиент Debug Adapter Protocol поверх QTcpSocket.
+
+    Чтение идёт по readyRead из цикла событий Qt, без таймеров опроса:
+    всё, что пришло, дописывается в bytearray, и за одно пробуждение
+    разбираются все целые сообщения. Content-Length считается в байтах,
+    а UTF-8 декодируется только у целого тела сообщения.
+    """
+
+    RETRY_FIRST_MS = 10
+    RETRY_MAX_MS = 200
+
     message_received = pyqtSignal(dict)
     connected = pyqtSignal()
+    connection_failed = pyqtSignal()
+    disconnected = pyqtSignal()
     output_received = pyqtSignal(str)
 
     def __init__(self, host="localhost", port=5678):
@@ -15,63 +30,130 @@ class DapClient(QObject):
         self.sock = None
         self.host = host
         self.port = port
-        self.buffer = ""
+        self.buffer = bytearray()
         self.seq = 1
+        self.capabilities = {}
+        self._callbacks = {}  # seq запроса -> callback(response)
+        self.is_connected = False
+        self._deadline = 0.0
+        self._retry_delay = self.RETRY_FIRST_MS
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._connect)
+
+    def connect_to_debugger(self, timeout_ms=0):
+        """Подключиться к адаптеру.
+
+        С timeout_ms отказ в соединении означает, что debugpy ещё не начал
+        слушать порт: повторяем попытку с растущей паузой, пока не выйдет
+        время. Так подключение происходит сразу, как только адаптер готов.
+        """
+        print("[DEBUG] Попытка подключения к debugpy")
+        self.sock = QTcpSocket(self)
+        self.sock.connected.connect(self._on_connected)
+        self.sock.readyRead.connect(self._on_ready_read)
+        self.sock.errorOccurred.connect(self._on_error)
+        self.sock.disconnected.connect(self._on_disconnected)
+        self._deadline = time.monotonic() + timeout_ms / 1000
+        self._retry_delay = self.RETRY_FIRST_MS
+        self._connect()
+
+    def _connect(self):
+        if self.sock is not None:
+            self.sock.connectToHost(self.host, self.port)
+
+    def _on_connected(self):
+        self.is_connected = True
+        # Короткие запросы (next, stepIn) не должны ждать алгоритма Нейгла
+        self.sock.setSocketOption(QAbstractSocket.SocketOption.LowDelayOption, 1)
+        print("[DEBUG] Сигнал connected отправлен")
+        self.connected.emit()
 
-    def connect_to_debugger(self):
-        try:
-            print("[DEBUG] Попытка подключения к debugpy")
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.connect((self.host, self.port))
-            self.sock.setblocking(False)
-            print("[DEBUG] Сигнал connected отправлен")
-            self.connected.emit()
-            QTimer.singleShot(100, self.poll_socket)
-        except Exception as e:
-            self.output_received.emit(
-                f"[Ошибка] Не удалось подключиться к отладчику: {e}")
-
-    def poll_socket(self):
-        if not self.sock:
+    def _on_disconnected(self):
+        self.is_connected = False
+        self.disconnected.emit()
+
+    def _on_error(self, error):
+        if self.is_connected:
+            if error != QAbstractSocket.SocketError.RemoteHostClosedError:
+                self.output_received.emit(f"[Ошибка] Соединение с отладчиком: {self.sock.errorString()}")
+            return
+        refused = error == QAbstractSocket.SocketError.ConnectionRefusedError
+        if refused and time.monotonic() + self._retry_delay / 1000 < self._deadline:
+            self._retry_timer.start(self._retry_delay)
+            self._retry_delay = min(self._retry_delay * 2, self.RETRY_MAX_MS)
             return
-        try:
-            data = self.sock.recv(4096).decode("utf-8")
-            if data:
-                self.buffer += data
-                self.process_buffer()
-        except BlockingIOError:
-            pass
-        QTimer.singleShot(100, self.poll_socket)
+        self.output_received.emit(
+            f"[Ошибка] Не удалось подключиться к отладчику: {self.sock.errorString()}")
+        self.connection_failed.emit()
+
+    def _on_ready_read(self):
+        self.buffer += self.sock.readAll().data()
+        self.process_buffer()
 
     def process_buffer(self):
-        while "\r\n\r\n" in self.buffer:
-            header_end = self.buffer.find("\r\n\r\n")
-            header = self.buffer[:header_end]
+        buffer = self.buffer
+        while True:
+            header_end = buffer.find(b"\r\n\r\n")
+            if header_end < 0:
+                break
             content_length = 0
-            for line in header.split("\r\n"):
-                if line.startswith("Content-Length:"):
-                    content_length = int(line.split(":")[1].strip())
+            for line in bytes(buffer[:header_end]).split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    content_length = int(value)
             body_start = header_end + 4
             body_end = body_start + content_length
-            if len(self.buffer) >= body_end:
-                body = self.buffer[body_start:body_end]
-                self.buffer = self.buffer[body_end:]
-                try:
-                    msg = json.loads(body)
-                    self.message_received.emit(msg)
-                except json.JSONDecodeError as e:
-                    self.output_received.emit(f"[JSON ошибка] {str(e)}")
-
-    def send_request(self, command, arguments=None):
+            if len(buffer) < body_end:
+                break
+            body = bytes(buffer[body_start:body_end])
+            # Срезаем до разбора: если обработчик упадёт или снова войдёт
+            # сюда, сообщение не придёт второй раз. Удаление из начала
+            # bytearray не сдвигает остаток, так что это дёшево
+            del buffer[:body_end]
+            try:
+                msg = json.loads(body)
+            except ValueError as e:
+                self.output_received.emit(f"[JSON ошибка] {str(e)}")
+                continue
+            if msg.get("type") == "response":
+                callback = self._callbacks.pop(msg.get("request_seq"), None)
+                if callback is not None:
+                    callback(msg)
+            self.message_received.emit(msg)
+
+    def send_request(self, command, arguments=None, callback=None):
+        """Отправить запрос; ``callback(response)`` вызовется с ответом на него."""
+        if not self.is_connected:
+            self.output_received.emit(f"[Ошибка] Нет соединения с отладчиком: {command}")
+            return None
+        seq = self.seq
         payload = json.dumps({
             "type": "request",
-            "seq": self.seq,
+            "seq": seq,
             "command": command,
             "arguments": arguments or {}
-        })
+        }).encode("utf-8")
         self.seq += 1
-        header = f"Content-Length: {len(payload)}\r\n\r\n"
-        self.sock.sendall((header + payload).encode("utf-8"))
+        if callback is not None:
+            self._callbacks[seq] = callback
+        header = f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii")
+        self.sock.write(header + payload)
+        return seq
+
+    def close(self):
+        """Закрыть соединение; уже записанные запросы (disconnect) успеют уйти."""
+        self._retry_timer.stop()
+        self.is_connected = False
+        self._callbacks.clear()
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            sock.readyRead.disconnect(self._on_ready_read)
+            sock.errorOccurred.disconnect(self._on_error)
+            sock.disconnected.connect(sock.deleteLater)
+            sock.disconnectFromHost()
+            if sock.state() == QAbstractSocket.SocketState.UnconnectedState:
+                sock.deleteLater()
 
     def initialize(self):
         self.send_request("initialize", {
@@ -83,7 +165,10 @@ class DapClient(QObject):
             "supportsVariableType": True,
             "supportsVariablePaging": True,
             "supportsRunInTerminalRequest": True
-        })
+        }, callback=self._on_initialized)
+
+    def _on_initialized(self, response):
+        self.capabilities = response.get("body") or {}
 
     def attach(self):
         self.send_request("attach", {
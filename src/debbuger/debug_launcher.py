@@ -1,24 +1,37 @@
 # src/debugger/debug_launcher.py
 
+import socket
+
 from PyQt6.QtCore import QObject, QProcess, pyqtSignal
 
 
+def free_port(host="127.0.0.1"):
+    """Свободный TCP-порт: его выдаёт ОС при bind на порт 0."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
 class DebugLauncher(QObject):
     process_started = pyqtSignal()
     process_error = pyqtSignal(str)
+    process_finished = pyqtSignal(int)
     output_received = pyqtSignal(str)
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, host="127.0.0.1", port=None):
         super().__init__()
         self.file_path = file_path
+        self.host = host
+        # У каждой сессии свой порт, поэтому отладок может идти несколько
+        self.port = port or free_port(host)
         self.process = QProcess()
 
     def start_debug_server(self):
-        # Команда: python -m debugpy --listen 5678 --wait-for-client your_script.py
+        # Команда: python -m debugpy --listen 127.0.0.1:<порт> --wait-for-client your_script.py
         self.process.setProgram("python")
         self.process.setArguments([
             "-m", "debugpy",
-            "--listen", "5678",
+            "--listen", f"{self.host}:{self.port}",
             "--wait-for-client",
             self.file_path
         ])
@@ -27,6 +40,8 @@ class DebugLauncher(QObject):
             QProcess.ProcessChannelMode.MergedChannels)
         self.process.readyReadStandardOutput.connect(self.read_output)
         self.process.errorOccurred.connect(self.handle_error)
+        self.process.started.connect(self.process_started)
+        self.process.finished.connect(lambda code, status: self.process_finished.emit(code))
 
         self.process.start()
         self.output_received.emit(f"[Запуск debugpy] {self.file_path}")
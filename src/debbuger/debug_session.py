@@ -0,0 +1,101 @@
+# src/debugger/debug_session.py
+
+import json
+import os
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .dap_client import DapClient
+from .debug_launcher import DebugLauncher
+
+
+class DebugSession(QObject):
+    """Один запуск debugpy и DAP-клиент к нему.
+
+    Порт выбирается свободный, поэтому сессий может быть несколько.
+    Подключение начинается сразу после запуска процесса: пока debugpy
+    не слушает порт, клиент повторяет попытки с растущей паузой.
+    """
+
+    CONNECT_TIMEOUT_MS = 15000
+
+    connected = pyqtSignal()
+    message_received = pyqtSignal(dict)
+    output_received = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.file_path = editor.file_path
+        self.thread_id = None
+        self.is_finished = False
+        self.stop_count = 0
+        self._cache = {}  # ответы stackTrace/scopes/variables текущей остановки
+
+        self.launcher = DebugLauncher(self.file_path)
+        self.name = f"{os.path.basename(self.file_path)}:{self.launcher.port}"
+        self.launcher.output_received.connect(self.output_received)
+        self.launcher.process_error.connect(self._on_process_error)
+        self.launcher.process_finished.connect(self._on_process_finished)
+
+        self.client = DapClient(self.launcher.host, self.launcher.port)
+        self.client.connected.connect(self.connected)
+        self.client.message_received.connect(self.message_received)
+        self.client.output_received.connect(self.output_received)
+        self.client.connection_failed.connect(self.stop)
+        self.client.disconnected.connect(self.stop)
+
+    def start(self):
+        self.launcher.start_debug_server()
+        self.client.connect_to_debugger(self.CONNECT_TIMEOUT_MS)
+
+    def invalidate(self):
+        """Программа пошла дальше: ссылки на кадры и переменные прошлой остановки
+        недействительны, как и ответы на них."""
+        self.stop_count += 1
+        self._cache.clear()
+
+    def request_cached(self, command, arguments, callback):
+        """Запрос, ответ на который не меняется до следующей остановки.
+
+        callback(response) вызывается и для ответа из кеша; ответы,
+        пришедшие уже после новой остановки, отбрасываются.
+        """
+        key = (command, json.dumps(arguments, sort_keys=True))
+        response = self._cache.get(key)
+        if response is not None:
+            callback(response)
+            return
+        stop_count = self.stop_count
+
+        def on_response(response):
+            if stop_count != self.stop_count:
+                return
+            if response.get("success"):
+                self._cache[key] = response
+            callback(response)
+
+        self.client.send_request(command, arguments, callback=on_response)
+
+    def stop(self):
+        if self.is_finished:
+            return
+        self.is_finished = True
+        if self.client.is_connected:
+            self.client.send_request("disconnect", {"terminateDebuggee": True})
+        self.client.close()
+        # Процесс завершаем сами — его ошибки и код выхода уже не интересны
+        self.launcher.process_error.disconnect(self._on_process_error)
+        self.launcher.process_finished.disconnect(self._on_process_finished)
+        self.launcher.stop()
+        self.finished.emit()
+
+    def _on_process_error(self, message):
+        self.output_received.emit(message)
+        if not self.launcher.is_running():
+            self.stop()
+
+    def _on_process_finished(self, code):
+        self.output_received.emit(f"[DEBUG] Процесс завершён с кодом {code}")
+        self.stop()
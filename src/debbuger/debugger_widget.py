@@ -6,33 +6,47 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QPushButton,
     QTextEdit,
-    QTreeWidget,
-    QTreeWidgetItem,
     QLabel,
+    QComboBox,
 )
 from PyQt6.QtCore import pyqtSlot, QTimer
 
+import os
 import sys
 import subprocess
 
-from .dap_client import DapClient
-from .debug_launcher import DebugLauncher
+from .call_stack_tree import CallStackTree
+from .debug_session import DebugSession
+from .variables_tree import VariablesTree
 import json  # для логирования сообщений
 
+# Печать каждого сообщения DAP в stdout. Выключено: на каждом шаге приходят
+# страницы stackTrace/variables, и json.dumps с отступами тормозит шаги
+LOG_DAP_MESSAGES = False
+
 
 class DebuggerWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_editor = None
-        self.dap_client = None
-        self.debug_launcher = None
-        self.current_thread_id = None
+        self.sessions = []
+        self.session = None  # сессия, которой управляют кнопки
+        # События output приходят пачками: копим их и дописываем в консоль
+        # одним append за проход цикла событий
+        self._pending_output = []
+        self._output_timer = QTimer(self)
+        self._output_timer.setSingleShot(True)
+        self._output_timer.setInterval(0)
+        self._output_timer.timeout.connect(self.flush_output)
         self.setup_ui()
         self.setup_connections()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
 
+        self.session_box = QComboBox()
+        layout.addWidget(self.session_box)
+
         self.btn_continue = QPushButton("▶▶ Continue")
         self.btn_step_over = QPushButton("⏭ Over")
         self.btn_step_in = QPushButton("⏭ In")
@@ -52,9 +66,7 @@ class DebuggerWidget(QWidget):
         layout.addWidget(QLabel("Output"))
         layout.addWidget(self.debug_output)
 
-        self.variables_tree = QTreeWidget()
-        self.variables_tree.setHeaderLabels(["Name", "Value", "Type"])
-        self.variables_tree.setStyleSheet("""
+        tree_style = """
                 QTreeWidget {
                     background-color: #2b2b2b;  /* тёмный фон */
                     color: #f0f0f0;             /* светлый текст */
@@ -75,8 +87,15 @@ class DebuggerWidget(QWidget):
                     background-color: #555555;
                     color: #ffffff;
                 }
-            """)
+            """
+
+        self.call_stack = CallStackTree()
+        self.call_stack.setStyleSheet(tree_style)
+        layout.addWidget(QLabel("Call Stack"))
+        layout.addWidget(self.call_stack)
 
+        self.variables_tree = VariablesTree()
+        self.variables_tree.setStyleSheet(tree_style)
         layout.addWidget(QLabel("Variables"))
         layout.addWidget(self.variables_tree)
 
@@ -89,6 +108,8 @@ class DebuggerWidget(QWidget):
         self.btn_step_in.clicked.connect(self.on_step_in_clicked)
         self.btn_step_out.clicked.connect(self.on_step_out_clicked)
         self.btn_stop.clicked.connect(self.stop_debugging)
+        self.session_box.currentIndexChanged.connect(self.on_session_selected)
+        self.call_stack.frame_selected.connect(self.on_frame_selected)
 
     def set_current_editor(self, editor):
         self.current_editor = editor
@@ -103,170 +124,185 @@ class DebuggerWidget(QWidget):
     def start_debugging(self):
         print("[DEBUG] Метод start_debugging вызван")
         if not self.current_editor or not self.current_editor.file_path:
-            self.debug_output.append("[Ошибка] Нет открытого файла для отладки.")
+            self.append_output(self.session, "[Ошибка] Нет открытого файла для отладки.")
             return
 
         file_path = self.current_editor.file_path
         print(f"[DEBUG] Попытка запуска отладки файла: {file_path}")
-        self.debug_output.clear()
+        if not self.sessions:
+            self._pending_output = []
+            self.debug_output.clear()
+
+        session = DebugSession(self.current_editor, self)
+        session.output_received.connect(lambda text, session=session: self.append_output(session, text))
+        session.connected.connect(lambda session=session: self.on_session_connected(session))
+        session.message_received.connect(lambda msg, session=session: self.handle_dap_message(session, msg))
+        session.finished.connect(lambda session=session: self.on_session_finished(session))
+        self.sessions.append(session)
+        self.session_box.addItem(session.name)
+        self.set_active_session(session)
+
+        session.start()
+        self.append_output(session, f"[DEBUG] Запущен debugpy для файла: {file_path}")
+
+    def set_active_session(self, session):
+        self.session = session
+        index = self.sessions.index(session) if session in self.sessions else -1
+        if self.session_box.currentIndex() != index:
+            self.session_box.setCurrentIndex(index)
+        self.call_stack.clear()
         self.variables_tree.clear()
-
-        self.debug_launcher = DebugLauncher(file_path)
-        self.debug_launcher.output_received.connect(self.debug_output.append)
-        self.debug_launcher.process_error.connect(self.debug_output.append)
-        self.debug_launcher.start_debug_server()
-
-        self.debug_output.append(f"[DEBUG] Запущен debugpy для файла: {file_path}")
-        QTimer.singleShot(1000, self.connect_to_dap_server)
-
-    def connect_to_dap_server(self):
-        print("[DEBUG] connect_to_dap_server() вызван")
-        self.dap_client = DapClient()
-        print("[DEBUG] DapClient создан")
-
-        def on_connected():
-            print("[DEBUG] Успешное подключение к DAP-серверу")
-            self.debug_output.append("[DEBUG] Успешное подключение к DAP-серверу")
+        self.set_buttons_enabled(session is not None and session.client.is_connected)
+        if session is not None and session.thread_id:
+            # Стек и переменные показываем только для активной сессии
+            self.call_stack.show_stop(session, session.thread_id)
+
+    def on_frame_selected(self, thread_id, level, frame):
+        session = self.session
+        frame_id, _, name, path, line = frame
+        # Шаги выполняются в потоке выбранного кадра
+        session.thread_id = thread_id
+        self.variables_tree.show_frame(session, frame_id, (thread_id, level, name))
+        if path and os.path.normcase(os.path.abspath(path)) == os.path.normcase(os.path.abspath(session.file_path)):
+            session.editor.highlight_debug_line(line - 1)
+
+    def on_session_selected(self, index):
+        if 0 <= index < len(self.sessions) and self.sessions[index] is not self.session:
+            self.set_active_session(self.sessions[index])
+
+    def on_session_connected(self, session):
+        print("[DEBUG] Успешное подключение к DAP-серверу")
+        self.append_output(session, "[DEBUG] Успешное подключение к DAP-серверу")
+        if session is self.session:
             self.set_buttons_enabled(True)
-            self.dap_client.initialize()
+        session.client.initialize()
 
-        self.dap_client.connected.connect(on_connected)
-        self.dap_client.message_received.connect(self.handle_dap_message)
-        self.dap_client.output_received.connect(self.debug_output.append)
-        self.dap_client.connect_to_debugger()
+    def on_session_finished(self, session):
+        if session not in self.sessions:
+            return
+        self.append_output(session, "[DEBUG] Сессия отладки завершена")
+        index = self.sessions.index(session)
+        self.sessions.remove(session)
+        self.session_box.removeItem(index)
+        if session is self.session:
+            self.set_active_session(self.sessions[-1] if self.sessions else None)
+        session.deleteLater()
+
+    def append_output(self, session, text):
+        if session is not None and len(self.sessions) > 1:
+            text = f"[{session.name}] {text}"
+        self._pending_output.append(text)
+        if not self._output_timer.isActive():
+            self._output_timer.start()
+
+    def handle_dap_message(self, session, msg):
+        if msg.get("type") == "event" and msg.get("event") == "output":
+            output = msg.get("body", {}).get("output", "").strip()
+            if output:
+                self.append_output(session, f"[Вывод] {output}")
+            return
 
-    def handle_dap_message(self, msg):
-        print("<< DAP Message:", json.dumps(msg, indent=2))
+        if LOG_DAP_MESSAGES:
+            print("<< DAP Message:", json.dumps(msg, indent=2))
+        client = session.client
 
         if msg.get("type") == "event":
             event_type = msg.get("event")
 
             if event_type == "initialized":
                 print("[DEBUG] Получено событие initialized")
-                self.debug_output.append("[DEBUG] DAP-сервер инициализирован")
+                self.append_output(session, "[DEBUG] DAP-сервер инициализирован")
 
                 breakpoints = [
-                    line for line in self.current_editor.breakpoints if line >= 0
+                    line for line in session.editor.breakpoints if line >= 0
                 ]
-                self.dap_client.set_breakpoints(
-                    self.current_editor.file_path, breakpoints
-                )
-                self.dap_client.send_request("configurationDone")
+                client.set_breakpoints(session.file_path, breakpoints)
+                client.send_request("configurationDone")
 
             elif event_type == "stopped":
                 reason = msg["body"].get("reason", "")
-                self.current_thread_id = msg["body"].get("threadId", 1)
-                line_number = msg["body"].get("line", 1) - 1
-                self.debug_output.append(f"[Остановка] Причина: {reason}")
-                self.current_editor.highlight_debug_line(line_number)
-
-                self.dap_client.send_request(
-                    "stackTrace", {"threadId": self.current_thread_id}
-                )
-
-            elif event_type == "output":
-                output = msg["body"].get("output", "").strip()
-                if output:
-                    self.debug_output.append(f"[Вывод] {output}")
+                session.thread_id = msg["body"].get("threadId", 1)
+                session.invalidate()
+                self.append_output(session, f"[Остановка] Причина: {reason}")
+                self.flush_output()
+                # Остановившаяся сессия становится активной; строку в
+                # редакторе подсветит выбор верхнего кадра
+                if session is not self.session:
+                    self.set_active_session(session)
+                else:
+                    self.call_stack.show_stop(session, session.thread_id)
+
+            elif event_type == "continued":
+                session.invalidate()
 
         elif msg.get("type") == "response":
             command = msg.get("command")
             if command == "initialize":
                 print("[DEBUG] Команда initialize завершена — отправляем launch")
-                self.dap_client.attach()
-
-            if command == "stackTrace":
-                stack_frames = msg["body"].get("stackFrames", [])
-                if stack_frames:
-                    frame_id = stack_frames[0]["id"]
-                    self.dap_client.send_request("scopes", {"frameId": frame_id})
-
-            elif command == "scopes":
-                scopes = msg["body"].get("scopes", [])
-                if scopes:
-                    scope_ref = scopes[0]["variablesReference"]
-                    self.dap_client.send_request(
-                        "variables", {"variablesReference": scope_ref}
-                    )
-
-            elif command == "variables":
-                variables = msg["body"].get("variables", [])
-                self.update_variables_tree(variables)
-
-    def update_variables_tree(self, variables):
-        self.variables_tree.clear()
-        for var in variables:
-            name = var.get("name", "")
-            value = var.get("value", "")
-            var_type = var.get("type", "unknown")
-            item = QTreeWidgetItem([name, value, var_type])
-            self.variables_tree.addTopLevelItem(item)
+                client.attach()
+
+    def flush_output(self):
+        self._output_timer.stop()
+        if self._pending_output:
+            self.debug_output.append("\n".join(self._pending_output))
+            self._pending_output = []
 
     def on_continue_clicked(self):
         print("[DEBUG] Кнопка 'Continue' нажата")
-        self.debug_output.append("[DEBUG] Продолжение выполнения...")
+        self.append_output(self.session, "[DEBUG] Продолжение выполнения...")
         self.continue_execution()
 
     def continue_execution(self):
-        if self.dap_client and self.current_thread_id:
+        if self.session and self.session.thread_id:
             print("[DEBUG] Выполняется команда: continue")
-            self.dap_client.send_request(
-                "continue", {"threadId": self.current_thread_id}
-            )
+            self.session.client.continue_execution(self.session.thread_id)
         else:
             print("[DEBUG] DAP клиент не инициализирован — продолжение невозможно")
-            self.debug_output.append("[Ошибка] Нет активного соединения с отладчиком.")
+            self.append_output(self.session, "[Ошибка] Нет активного соединения с отладчиком.")
 
     def on_step_over_clicked(self):
         print("[DEBUG] Кнопка 'Step Over' нажата")
-        self.debug_output.append("[DEBUG] Шаг выполнения: Next (Step Over)")
+        self.append_output(self.session, "[DEBUG] Шаг выполнения: Next (Step Over)")
         self.step_over()
 
     def step_over(self):
-        if self.dap_client and self.current_thread_id:
+        if self.session and self.session.thread_id:
             print("[DEBUG] Выполняется команда: next")
-            self.dap_client.send_request("next", {"threadId": self.current_thread_id})
+            self.session.client.next_step(self.session.thread_id)
         else:
             print("[DEBUG] DAP клиент не инициализирован — шаг недоступен")
 
     def on_step_in_clicked(self):
         print("[DEBUG] Кнопка 'Step In' нажата")
-        self.debug_output.append("[DEBUG] Шаг выполнения: Step In")
+        self.append_output(self.session, "[DEBUG] Шаг выполнения: Step In")
         self.step_in()
 
     def step_in(self):
-        if self.dap_client and self.current_thread_id:
+        if self.session and self.session.thread_id:
             print("[DEBUG] Выполняется команда: stepIn")
-            self.dap_client.send_request("stepIn", {"threadId": self.current_thread_id})
+            self.session.client.step_in(self.session.thread_id)
         else:
             print("[DEBUG] DAP клиент не инициализирован — шаг недоступен")
 
     def on_step_out_clicked(self):
         print("[DEBUG] Кнопка 'Step Out' нажата")
-        self.debug_output.append("[DEBUG] Шаг выполнения: Step Out")
+        self.append_output(self.session, "[DEBUG] Шаг выполнения: Step Out")
         self.step_out()
 
     def step_out(self):
-        if self.dap_client and self.current_thread_id:
+        if self.session and self.session.thread_id:
             print("[DEBUG] Выполняется команда: stepOut")
-            self.dap_client.send_request(
-                "stepOut", {"threadId": self.current_thread_id}
-            )
+            self.session.client.step_out(self.session.thread_id)
         else:
             print("[DEBUG] DAP клиент не инициализирован — шаг недоступен")
 
     def stop_debugging(self):
         print("[DEBUG] Кнопка 'Stop' нажата")
-        self.debug_output.append("[DEBUG] Остановка отладки...")
-
-        if self.debug_launcher:
-            print("[DEBUG] Останавливается debug_launcher")
-            self.debug_launcher.stop()
-
-        if self.dap_client:
+        if self.session:
+            self.append_output(self.session, "[DEBUG] Остановка отладки...")
             print("[DEBUG] Отправка команды disconnect")
-            self.dap_client.send_request("disconnect")
-            self.dap_client = None
+            self.session.stop()
 
-        self.variables_tree.clear()
-        self.set_buttons_enabled(False)
+    def stop_all(self):
+        for session in list(self.sessions):
+            session.stop()
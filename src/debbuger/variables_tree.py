@@ -0,0 +1,246 @@
+# src/debugger/variables_tree.py
+
+from PyQt6 import sip
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
+
+PAGE_SIZE = 100
+CHANGED_COLOR = QColor("#e5c07b")  # значение изменилось с прошлой остановки
+
+FETCH_ROLE = Qt.ItemDataRole.UserRole       # что запросить при раскрытии
+LOADED_ROLE = Qt.ItemDataRole.UserRole + 1  # дети уже запрошены
+
+
+class VariablesTree(QTreeWidget):
+    """Переменные остановленного кадра.
+
+    Дети узла запрашиваются у адаптера только при его раскрытии. Большие
+    коллекции (indexedVariables > PAGE_SIZE) делятся на диапазоны по
+    PAGE_SIZE, PAGE_SIZE² ... элементов, и запрос variables с
+    start/count уходит лишь за раскрытый диапазон. Если адаптер не сообщает
+    размер, но умеет отдавать страницы, в конце страницы появляется
+    узел «load more».
+
+    На следующей остановке той же сессии дерево не строится заново: новые
+    ответы сверяются с узлами по пути имён (scope, имя, ...), меняется
+    только отличающийся текст, а изменившиеся значения подсвечиваются.
+    Раскрытые узлы перезапрашиваются, свёрнутые забывают детей до
+    раскрытия; какие пути были раскрыты, дерево помнит само.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHeaderLabels(["Name", "Value", "Type"])
+        self.session = None
+        self._frame_key = None
+        self._generation = 0
+        self._expanded = set()  # пути раскрытых узлов
+        self.itemExpanded.connect(self._on_item_expanded)
+        self.itemCollapsed.connect(lambda item: self._expanded.discard(self._path(item)))
+        self.itemClicked.connect(self._on_item_clicked)
+
+    def clear(self):
+        # Ответы на запросы для прежнего содержимого больше не нужны
+        self._generation += 1
+        self.session = None
+        self._frame_key = None
+        super().clear()
+
+    def show_frame(self, session, frame_id, key=None):
+        """Показать переменные кадра; ``key`` — его идентичность между шагами.
+
+        С тем же key (тот же поток, глубина и функция) дерево сверяется с
+        прошлым содержимым; другой кадр показывается с чистого листа.
+        """
+        if session is not self.session or key != self._frame_key:
+            self.clear()
+            self.session = session
+            self._frame_key = key
+        self._request(None, "scopes", {"frameId": frame_id}, self._on_scopes)
+
+    def _request(self, parent, command, arguments, handler):
+        generation = self._generation
+
+        def on_response(response):
+            if generation != self._generation:
+                return
+            if parent is not None and (sip.isdeleted(parent) or parent.treeWidget() is not self):
+                return  # узел убрали, пока шёл запрос
+            if not response.get("success"):
+                message = f"<{response.get('message', 'error')}>"
+                self._sync(parent, [(message, "", "", None)], False)
+                return
+            handler(parent, response.get("body") or {})
+
+        self.session.request_cached(command, arguments, on_response)
+
+    def _on_scopes(self, parent, body):
+        scopes = body.get("scopes", [])
+        fresh = self.topLevelItemCount() == 0
+        self._sync(None, [(scope["name"], "", "", _fetch(scope)) for scope in scopes], not fresh)
+        if fresh and not any((scope["name"],) in self._expanded for scope in scopes):
+            for index, scope in enumerate(scopes):
+                if not scope.get("expensive"):
+                    self.topLevelItem(index).setExpanded(True)  # локальные переменные видны сразу
+                    break
+
+    def _on_item_expanded(self, item):
+        self._expanded.add(self._path(item))
+        if item.data(0, FETCH_ROLE) is not None and not item.data(0, LOADED_ROLE):
+            self._load(item, False)
+
+    def _load(self, item, refresh):
+        item.setData(0, LOADED_ROLE, True)
+        fetch = item.data(0, FETCH_ROLE)
+        kind = fetch[0]
+        if kind == "variables":
+            _, reference, indexed, named = fetch
+            if indexed and indexed > PAGE_SIZE:
+                ranges = _range_specs(reference, 0, indexed)
+                if named:
+                    # Именованные поля идут перед диапазонами индексов
+                    self._request(item, "variables", {"variablesReference": reference, "filter": "named"},
+                                  lambda parent, body: self._sync(parent, _specs(body) + ranges, refresh))
+                else:
+                    self._sync(item, ranges, refresh)
+            elif indexed is None and self.session.client.capabilities.get("supportsVariablePaging"):
+                # Столько страниц, сколько уже было подгружено
+                loaded = sum(1 for i in range(item.childCount())
+                             if (item.child(i).data(0, FETCH_ROLE) or ("",))[0] != "more")
+                self._request_page(item, reference, 0, max(PAGE_SIZE, -(-loaded // PAGE_SIZE) * PAGE_SIZE),
+                                   refresh)
+            else:
+                self._request(item, "variables", {"variablesReference": reference},
+                              lambda parent, body: self._sync(parent, _specs(body), refresh))
+        elif kind == "range":
+            _, reference, start, count = fetch
+            if count > PAGE_SIZE:
+                self._sync(item, _range_specs(reference, start, count), refresh)
+            else:
+                self._request(item, "variables", {"variablesReference": reference, "filter": "indexed",
+                                                  "start": start, "count": count},
+                              lambda parent, body: self._sync(parent, _specs(body), refresh))
+
+    def _on_item_clicked(self, item, column):
+        fetch = item.data(0, FETCH_ROLE)
+        if fetch is None or fetch[0] != "more":
+            return
+        parent = item.parent()
+        parent.removeChild(item)
+        self._request_page(parent, fetch[1], fetch[2], PAGE_SIZE, False)
+
+    def _request_page(self, parent, reference, start, count, refresh):
+        def on_page(parent, body):
+            specs = _specs(body)
+            if start == 0:
+                self._sync(parent, specs, refresh)
+            else:
+                parent.addChildren([_new_item(*spec) for spec in specs])
+            if len(specs) == count:
+                more = QTreeWidgetItem(["… load more", "", ""])
+                more.setData(0, FETCH_ROLE, ("more", reference, start + count))
+                parent.addChild(more)
+
+        self._request(parent, "variables", {"variablesReference": reference, "start": start,
+                                            "count": count}, on_page)
+
+    def _sync(self, parent, specs, refresh):
+        """Привести детей ``parent`` к списку (имя, значение, тип, fetch).
+
+        Узлы с тем же именем остаются на месте и лишь обновляются, так что
+        не теряются ни раскрытие, ни прокрутка. При ``refresh`` новые и
+        изменившиеся значения подсвечиваются.
+        """
+        root = parent if parent is not None else self.invisibleRootItem()
+        names = {spec[0] for spec in specs}
+        existing = {}
+        for child in [root.child(i) for i in range(root.childCount())]:
+            name = child.text(0)
+            if name in names and name not in existing:
+                existing[name] = child
+            else:
+                root.removeChild(child)
+
+        for index, (name, value, var_type, fetch) in enumerate(specs):
+            item = existing.pop(name, None)
+            if item is None:
+                item = _new_item(name, value, var_type, fetch)
+                if refresh:
+                    item.setData(1, Qt.ItemDataRole.ForegroundRole, CHANGED_COLOR)
+                root.insertChild(index, item)
+            else:
+                if root.child(index) is not item:
+                    root.removeChild(item)
+                    root.insertChild(index, item)
+                self._update(item, value, var_type, fetch)
+            if fetch is not None and not item.isExpanded() and self._path(item) in self._expanded:
+                item.setExpanded(True)
+
+    def _update(self, item, value, var_type, fetch):
+        # Каждый set* шлёт dataChanged в вид, поэтому трогаем только отличия
+        changed = item.text(1) != value
+        if changed:
+            item.setText(1, value)
+        if item.text(2) != var_type:
+            item.setText(2, var_type)
+        if changed or item.data(1, Qt.ItemDataRole.ForegroundRole) is not None:
+            item.setData(1, Qt.ItemDataRole.ForegroundRole, CHANGED_COLOR if changed else None)
+        old = item.data(0, FETCH_ROLE)
+        if fetch is None:
+            if old is not None:
+                item.setData(0, FETCH_ROLE, None)
+                item.takeChildren()
+                item.setData(0, LOADED_ROLE, False)
+                item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicator)
+            return
+        # Ссылки variablesReference действуют только до следующего шага
+        item.setData(0, FETCH_ROLE, fetch)
+        if old is None:
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+        if item.data(0, LOADED_ROLE):
+            if item.isExpanded():
+                self._load(item, True)
+            else:
+                item.takeChildren()
+                item.setData(0, LOADED_ROLE, False)
+
+    def _path(self, item):
+        path = []
+        while item is not None:
+            path.append(item.text(0))
+            item = item.parent()
+        return tuple(reversed(path))
+
+
+def _fetch(var):
+    reference = var.get("variablesReference", 0)
+    if not reference:
+        return None
+    return ("variables", reference, var.get("indexedVariables"), var.get("namedVariables"))
+
+
+def _specs(body):
+    return [(var.get("name", ""), var.get("value", ""), var.get("type", ""), _fetch(var))
+            for var in body.get("variables", [])]
+
+
+def _range_specs(reference, start, count):
+    # Не больше PAGE_SIZE диапазонов на уровень: миллион элементов —
+    # сто диапазонов по десять тысяч, а не десять тысяч строк
+    chunk = PAGE_SIZE
+    while chunk * PAGE_SIZE < count:
+        chunk *= PAGE_SIZE
+    return [(f"[{first}..{first + min(chunk, start + count - first) - 1}]", "", "",
+             ("range", reference, first, min(chunk, start + count - first)))
+            for first in range(start, start + count, chunk)]
+
+
+def _new_item(name, value, var_type, fetch):
+    item = QTreeWidgetItem([name, value, var_type])
+    if fetch is not None:
+        item.setData(0, FETCH_ROLE, fetch)
+        item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+    else:
+        item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicator)
+    return item
@@ -1,19 +1,57 @@
 # auto_completer.py
-import jedi
-from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtWidgets import QCompleter
-from PyQt6.QtCore import QTimer, Qt, QRect, QStringListModel, QObject
+from PyQt6.QtCore import QTimer, Qt, QRect, QObject, QAbstractListModel, QModelIndex
 from PyQt6.QtGui import QTextCursor
+from src.editor.completion_worker import CompletionRequest, completion_worker
+from src.editor.fuzzy_ranker import recent_completions
+from src.editor.python_tokenizer import PythonTokenizer
+from src.editor.word_index import DocumentWords, word_index
+
+
+class CompletionListModel(QAbstractListModel):
+    """Результат FuzzyIndex.filter без копирования строк.
+
+    Модель хранит только индексы кандидатов; текст строки берётся, когда
+    вид её запрашивает, то есть для видимых в попапе строк. После них
+    идут слова из открытых документов (``extra``), которых нет у jedi.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._index = None
+        self._rows = []
+        self._extra = []
+
+    def set_results(self, index, rows, extra=()):
+        self.beginResetModel()
+        self._index = index
+        self._rows = rows
+        self._extra = list(extra)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows) + len(self._extra)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole) and index.isValid():
+            row = index.row()
+            if row < len(self._rows):
+                return self._index.names[self._rows[row]]
+            return self._extra[row - len(self._rows)]
+        return None
 
 
 class CompleterMixin(QObject):
+    # Повторные символы того же слова обслуживает кэш, поэтому к jedi
+    # можно идти почти сразу
+    COMPLETION_DELAY_MS = 20
+
     def setup_completer(self):
-        self.completion_model = QStringListModel()
+        self.completion_model = CompletionListModel(self)
         self.qcompleter = QCompleter(self.completion_model, self)
         self.qcompleter.setCompletionMode(
             QCompleter.CompletionMode.PopupCompletion)
         self.qcompleter.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.qcompleter.setFilterMode(Qt.MatchFlag.MatchContains)
         self.qcompleter.setWrapAround(True)
         self.qcompleter.setWidget(self)
         self.qcompleter.popup().installEventFilter(self)
@@ -32,11 +70,24 @@ class CompleterMixin(QObject):
             }
         """)
         self.qcompleter.popup().setMinimumWidth(300)
+        # Иначе вид запрашивает размер каждой строки, а не только видимых
+        self.qcompleter.popup().setUniformItemSizes(True)
         self.qcompleter.activated.connect(self.insert_completion)
 
         self.completion_timer = QTimer(self)
         self.completion_timer.setSingleShot(True)
         self.completion_timer.timeout.connect(self.request_completion)
+        self._completion_request = None
+        self._completion_cache = None  # (ключ, ревизия, FuzzyIndex)
+        # Ревизия растёт на каждой правке вне дописываемого слова; ключ
+        # позиции её не заменяет — правка той же длины в другой строке
+        # его не меняет. document().revision() не годится: её двигает и
+        # перекраска подсветчиком
+        self._completion_revision = 0
+        self._completion_span = (0, 0)  # слово, которое сейчас дописывают
+        self.document().contentsChange.connect(self._on_completion_contents_change)
+        completion_worker.completed.connect(self.on_completion_ready)
+        self.document_words = DocumentWords(self.document(), word_index, self)
 
     def eventFilter(self, obj, event):
         if hasattr(self, 'qcompleter') and self.qcompleter is not None:
@@ -48,36 +99,89 @@ class CompleterMixin(QObject):
                     return True
         return super().eventFilter(obj, event)
 
-    def request_completion(self):
+    def completion_context(self):
+        """Слово перед курсором и ключ, при котором его варианты ещё верны.
+
+        Ключ — позиция начала слова, номер строки, текст строки до слова и
+        длина документа без самого слова: пока пользователь дописывает
+        слово, ключ не меняется, любая правка вне слова его сбивает.
+        """
         cursor = self.textCursor()
         current_block_text = cursor.block().text()
         column = cursor.positionInBlock()
 
-        word = ''
-        for i in range(column - 1, -1, -1):
-            if not current_block_text[i].isalnum() and current_block_text[i] != '_':
-                break
-            word = current_block_text[i] + word
+        start = column
+        while start > 0 and (current_block_text[start - 1].isalnum() or current_block_text[start - 1] == '_'):
+            start -= 1
+        word = current_block_text[start:column]
+        key = (cursor.position() - len(word), cursor.blockNumber(),
+               current_block_text[:start], self.document().characterCount() - len(word))
+        self._completion_span = (cursor.position() - len(word), cursor.position())
+        return word, key
+
+    def _on_completion_contents_change(self, position, removed, added):
+        start, end = self._completion_span
+        if start <= position and position + removed <= end:
+            self._completion_span = (start, end + added - removed)
+        else:
+            self._completion_revision += 1
+
+    def complete_from_cache(self):
+        """Показать варианты из кэша; False, если для текущего слова его нет."""
+        if self._completion_cache is None:
+            return False
+        word, key = self.completion_context()
+        cached_key, revision, index = self._completion_cache
+        if key != cached_key or revision != self._completion_revision or not word:
+            return False
+        self.completion_timer.stop()
+        extra = [w for w in word_index.complete(word) if w not in index]
+        self.show_completions(index, index.filter(word), extra)
+        return True
+
+    def semantic_completion_enabled(self):
+        # jedi понимает только Python; безымянный буфер считаем питоном
+        return not self.file_path or PythonTokenizer.handles(self.file_path)
 
+    def request_completion(self):
+        word, key = self.completion_context()
         if len(word) < 1:
+            self._completion_request = None
+            completion_worker.cancel(self)
             self.qcompleter.popup().hide()
             return
+        if self.complete_from_cache():
+            return
+        # Слова из открытых документов показываем сразу, не дожидаясь jedi
+        self.show_completions(None, [], word_index.complete(word))
+        if not self.semantic_completion_enabled():
+            return
 
-        source_code = self.toPlainText()
-        line = cursor.blockNumber() + 1
-        column = cursor.positionInBlock()
-
-        self.auto_completer = AutoCompleter(self, source_code, line, column)
-        self.auto_completer.suggestions_ready.connect(
-            self.show_suggestions, Qt.ConnectionType.QueuedConnection)
-        self.auto_completer.start()
-
-    def show_suggestions(self, suggestions):
-        if not suggestions:
+        # jedi спрашиваем в начале слова: полный список для этого места
+        # дальше фильтруется локально, сколько бы букв ни дописали
+        cursor = self.textCursor()
+        request = CompletionRequest(
+            self.toPlainText(), cursor.blockNumber() + 1, cursor.positionInBlock() - len(word),
+            self.file_path, self._completion_revision)
+        request.key = key
+        self._completion_request = request
+        completion_worker.submit(self, request)
+
+    def on_completion_ready(self, owner, request, index):
+        if owner is not self or request is not self._completion_request:
+            return
+        self._completion_request = None
+        if request.revision != self._completion_revision:
+            return  # пока jedi считал, текст вне слова изменился
+        self._completion_cache = (request.key, request.revision, index)
+        self.complete_from_cache()
+
+    def show_completions(self, index, rows, extra=()):
+        if not rows and not extra:
             self.qcompleter.popup().hide()
             return
 
-        self.completion_model.setStringList(suggestions)
+        self.completion_model.set_results(index, rows, extra)
         cursor_rect = self.cursorRect()
         self.qcompleter.complete(
             QRect(cursor_rect.topLeft(), cursor_rect.size()))
@@ -86,6 +190,7 @@ class CompleterMixin(QObject):
         if not text:
             return
 
+        recent_completions.note(text)
         cursor = self.textCursor()
         cursor.select(QTextCursor.SelectionType.WordUnderCursor)
         cursor.removeSelectedText()
@@ -98,8 +203,8 @@ class CompleterMixin(QObject):
         cursor.select(QTextCursor.SelectionType.WordUnderCursor)
         selected_text = cursor.selectedText()
 
-        if len(selected_text) >= 1:
-            self.completion_timer.start(300)
+        if len(selected_text) >= 1 and not self.complete_from_cache():
+            self.completion_timer.start(self.COMPLETION_DELAY_MS)
 
     def eventFilter(self, obj, event):
         if hasattr(self, 'qcompleter') and self.qcompleter is not None:
@@ -111,27 +216,3 @@ class CompleterMixin(QObject):
                     return True
         return super().eventFilter(obj, event)
 
-
-class AutoCompleter(QThread):
-    suggestions_ready = pyqtSignal(list)
-
-    def __init__(self, code_editor, source, line, column):
-        super().__init__()
-        self.code_editor = code_editor
-        self.source = source
-        self.line = line
-        self.column = column
-
-    def run(self):
-        try:
-            if self.code_editor.file_path:
-                script = jedi.Script(
-                    self.source, path=self.code_editor.file_path)
-            else:
-                script = jedi.Script(self.source)
-            completions = script.complete(self.line, self.column)
-            suggestions = [c.name for c in completions]
-            self.suggestions_ready.emit(suggestions)
-        except Exception as e:
-            print("Ошибка автодополнения:", e)
-            self.suggestions_ready.emit([])
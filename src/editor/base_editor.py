@@ -1,10 +1,10 @@
 from PyQt6.QtWidgets import QPlainTextEdit
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import QRect, QTimer
+from PyQt6.QtCore import QRect
 
 from src.editor.line_number import LineNumberArea
 from src.editor.syntax_hightlighter import ReliableSyntaxHighlighter
-from pygments.lexers import get_lexer_for_filename
+from src.editor.lexer_registry import lexer_registry
 
 
 class BaseEditor(QPlainTextEdit):
@@ -12,15 +12,10 @@ class BaseEditor(QPlainTextEdit):
         super().__init__(parent)
         self.line_number_area = LineNumberArea(self)
         self.highlighter = ReliableSyntaxHighlighter(self.document())
-        self.update_timer = QTimer(self)
-        self.update_timer.setSingleShot(True)
-        self.update_timer.timeout.connect(self.update_line_number_area)
+        self.highlighter.scheduler.set_view(self)
 
         self.setup_editor()
 
-        self.document().contentsChanged.connect(self.update_line_number_area)
-        self.verticalScrollBar().valueChanged.connect(self.update_line_number_area_on_scroll)
-
     def setup_editor(self):
         font = QFont("Courier New", 20)
         metrics = self.fontMetrics()
@@ -36,12 +31,6 @@ class BaseEditor(QPlainTextEdit):
         """)
         self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
 
-    def update_line_number_area(self):
-        self.line_number_area.update(0, 0, self.line_number_area.width(), self.height())
-
-    def update_line_number_area_on_scroll(self):
-        self.update_timer.start(100)
-
     def resizeEvent(self, event):
         super().resizeEvent(event)
         cr = self.contentsRect()
@@ -51,7 +40,7 @@ class BaseEditor(QPlainTextEdit):
 
     def set_lexer_by_filename(self, filename):
         try:
-            lexer = get_lexer_for_filename(filename)
-            self.highlighter.set_lexer(lexer)
+            engine = lexer_registry.engine_for_filename(filename)
+            self.highlighter.set_engine(engine)
         except Exception:
-            self.highlighter.set_lexer(None)
+            self.highlighter.set_engine(None)
@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+
+import jedi
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src.editor.fuzzy_ranker import FuzzyIndex, recent_completions
+from src.editor.jedi_projects import common_imports, project_cache
+
+
+class CompletionRequest:
+    def __init__(self, source, line, column, path=None, revision=0):
+        self.source = source
+        self.line = line          # с единицы, как у jedi
+        self.column = column
+        self.path = path
+        self.revision = revision  # счётчик правок редактора на момент запроса
+
+
+class CompletionWorker(QObject):
+    """Один фоновый поток автодополнения на всё приложение.
+
+    Для каждого редактора хранится только последний запрос: новый запрос
+    заменяет ещё не начатый, а результат уже устаревшего (пока считался,
+    пришёл новый) выбрасывается, не доходя до редактора.
+
+    В свободное время поток заранее разбирает модули, которые чаще всего
+    импортируются в проекте, — первое дополнение по numpy/pandas уже не
+    ждёт их разбора.
+    """
+
+    completed = pyqtSignal(object, object, object)  # владелец, запрос, FuzzyIndex
+
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()  # владелец -> CompletionRequest
+        self._preload = []             # (корень, модуль или None для сканирования)
+        self._preloaded_roots = set()
+        self._thread = None
+
+    def submit(self, owner, request):
+        with self._condition:
+            self._pending.pop(owner, None)
+            self._pending[owner] = request
+            self._wake()
+
+    def preload(self, root):
+        """Прогреть кэш jedi для проекта в папке ``root``."""
+        if not root or not os.path.isdir(root):
+            return
+        root = os.path.abspath(root)
+        with self._condition:
+            if root in self._preloaded_roots:
+                return
+            self._preloaded_roots.add(root)
+            self._preload.append((root, None))
+            self._wake()
+
+    def _wake(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="completion", daemon=True)
+            self._thread.start()
+        self._condition.notify()
+
+    def cancel(self, owner):
+        with self._condition:
+            self._pending.pop(owner, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._preload:
+                    self._condition.wait()
+                # Запросы пользователя всегда важнее прогрева
+                if self._pending:
+                    owner, request = self._pending.popitem(last=False)
+                else:
+                    owner, request = None, self._preload.pop(0)
+
+            if owner is None:
+                self._run_preload(*request)
+                continue
+
+            suggestions = self._complete(request)
+            with self._condition:
+                if owner in self._pending:
+                    continue  # пока считали, пришёл более новый запрос
+
+            # Индекс для нечёткого поиска тоже строим здесь, а не в GUI-потоке
+            index = FuzzyIndex(recent_completions)
+            index.set_candidates(suggestions)
+            self.completed.emit(owner, request, index)
+
+    def _complete(self, request):
+        try:
+            script = jedi.Script(request.source, path=request.path,
+                                 project=project_cache.project_for(request.path))
+            return [c.name for c in script.complete(request.line, request.column)]
+        except Exception as e:
+            print("Ошибка автодополнения:", e)
+            return []
+
+    def _run_preload(self, root, module):
+        try:
+            if module is None:
+                # Сначала только сканируем импорты; каждый модуль — отдельная
+                # задача, чтобы между ними успевали запросы пользователя
+                modules = common_imports(root)
+                with self._condition:
+                    self._preload.extend((root, name) for name in modules)
+                return
+            source = f"import {module}\n{module}."
+            script = jedi.Script(source, project=project_cache.project_for(root))
+            script.complete(2, len(module) + 1)
+        except Exception as e:
+            print("Ошибка предзагрузки модуля:", module, e)
+
+
+completion_worker = CompletionWorker()
@@ -0,0 +1,224 @@
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QColor, QTextCharFormat, QTextCursor, QTextFormat
+from PyQt6.QtWidgets import QTextEdit
+
+
+def line_format(color):
+    fmt = QTextCharFormat()
+    fmt.setBackground(QColor(color))
+    fmt.setProperty(QTextFormat.Property.FullWidthSelection, True)
+    return fmt
+
+
+class DecorationLayer:
+    """Один слой подсветки поверх текста (текущая строка, брейкпоинты, ...).
+
+    Слой отдаёт ExtraSelection только для видимого диапазона блоков;
+    менеджер кэширует результат, пока слой не изменится или не сдвинется
+    видимая область.
+    """
+
+    def __init__(self, name, z=0):
+        self.name = name
+        self.z = z
+        self.manager = None
+
+    def invalidate(self):
+        if self.manager is not None:
+            self.manager.invalidate(self.name)
+
+    def selections(self, first_block, last_block):
+        return []
+
+    def _line_selection(self, block, fmt):
+        selection = QTextEdit.ExtraSelection()
+        selection.format = fmt
+        selection.cursor = QTextCursor(block)
+        return selection
+
+
+class CurrentLineLayer(DecorationLayer):
+    def __init__(self, name, color, z=0):
+        super().__init__(name, z)
+        self.format = line_format(color)
+
+    def selections(self, first_block, last_block):
+        editor = self.manager.editor
+        if editor.isReadOnly():
+            return []
+        block = editor.textCursor().block()
+        if not first_block <= block.blockNumber() <= last_block:
+            return []
+        return [self._line_selection(block, self.format)]
+
+
+class MarkerLayer(DecorationLayer):
+    """Строки с метками вида ``kind`` из MarkerIndex; следует за правками."""
+
+    def __init__(self, name, markers, kind, color, z=0):
+        super().__init__(name, z)
+        self.markers = markers
+        self.kind = kind
+        self.format = line_format(color)
+        markers.changed.connect(self._on_markers_changed)
+
+    def _on_markers_changed(self, kind):
+        if kind == self.kind:
+            self.invalidate()
+
+    def selections(self, first_block, last_block):
+        document = self.manager.editor.document()
+        result = []
+        for line, _ in self.markers.in_range(self.kind, first_block, last_block):
+            block = document.findBlockByNumber(line)
+            if block.isValid():
+                result.append(self._line_selection(block, self.format))
+        return result
+
+
+def underline_format(color, style=QTextCharFormat.UnderlineStyle.WaveUnderline):
+    fmt = QTextCharFormat()
+    fmt.setUnderlineStyle(style)
+    fmt.setUnderlineColor(QColor(color))
+    return fmt
+
+
+class DiagnosticLayer(DecorationLayer):
+    """Подчёркивания диагностик LSP из DiagnosticIndex.
+
+    Индекс отдаёт только диагностики видимых строк, так что тысячи
+    предупреждений в файле не стоят ничего при наборе и прокрутке. Пока
+    сервер не прислал новый список, вставка и удаление строк сдвигают
+    старый.
+    """
+
+    def __init__(self, name, document, formats, z=0):
+        super().__init__(name, z)
+        self.document = document
+        self.formats = formats  # severity -> QTextCharFormat
+        self.index = None
+        self._block_count = document.blockCount()
+        document.contentsChange.connect(self._on_contents_change)
+
+    def set_index(self, index):
+        self.index = index
+        self.invalidate()
+
+    def _on_contents_change(self, position, removed, added):
+        block_count = self.document.blockCount()
+        delta = block_count - self._block_count
+        if not delta:
+            return
+        self._block_count = block_count
+        if self.index:
+            block = self.document.findBlock(position)
+            line = block.blockNumber()
+            if delta > 0 and position == block.position():
+                line -= 1  # перевод строки в начале блока сдвигает и сам блок
+            self.index = self.index.shifted(line, delta)
+            self.invalidate()
+
+    def selections(self, first_block, last_block):
+        if not self.index:
+            return []
+        document = self.document
+        result = []
+        for line, character, end_line, end_character, severity, _ in self.index.in_lines(first_block, last_block):
+            fmt = self.formats.get(severity)
+            start_block = document.findBlockByNumber(line)
+            end_block = document.findBlockByNumber(end_line)
+            if fmt is None or not start_block.isValid():
+                continue
+            if not end_block.isValid():
+                end_block = document.lastBlock()
+                end_character = end_block.length() - 1
+            start = start_block.position() + min(character, start_block.length() - 1)
+            end = end_block.position() + min(end_character, end_block.length() - 1)
+            if end <= start:
+                # Пустой диапазон (например, «нет перевода строки в конце») — подчёркиваем символ
+                end = min(start + 1, document.characterCount() - 1)
+            selection = QTextEdit.ExtraSelection()
+            selection.format = fmt
+            cursor = QTextCursor(document)
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            selection.cursor = cursor
+            result.append(selection)
+        return result
+
+
+class DecorationManager(QObject):
+    """Собирает слои в один setExtraSelections.
+
+    Каждый слой меняется независимо; итоговый список собирается лениво
+    (один раз за проход цикла событий) и только для видимых строк.
+    """
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self._layers = []
+        self._cache = {}
+        self._visible = None
+        self._dirty = False
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.apply)
+
+        editor.updateRequest.connect(self._on_update_request)
+        editor.blockCountChanged.connect(lambda _: self.invalidate())
+
+    def add_layer(self, layer):
+        layer.manager = self
+        self._layers.append(layer)
+        self._layers.sort(key=lambda l: l.z)
+        self.invalidate(layer.name)
+        return layer
+
+    def layer(self, name):
+        for layer in self._layers:
+            if layer.name == name:
+                return layer
+        raise KeyError(name)
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
+        self._dirty = True
+        self._schedule()
+
+    def _on_update_request(self, rect, dy):
+        # Курсор мигает через тот же сигнал — пересобираем только при прокрутке
+        if dy or self._visible != self._visible_range():
+            self._schedule()
+
+    def _schedule(self):
+        # Перезапуск отодвигал бы сборку, пока идут события подсветки
+        if not self._timer.isActive():
+            self._timer.start(0)
+
+    def _visible_range(self):
+        first = self.editor.firstVisibleBlock().blockNumber()
+        line_height = max(1, self.editor.fontMetrics().height())
+        return first, first + self.editor.viewport().height() // line_height + 1
+
+    def apply(self):
+        visible = self._visible_range()
+        if visible != self._visible:
+            self._cache.clear()
+            self._visible = visible
+        elif not self._dirty:
+            return
+        self._dirty = False
+
+        selections = []
+        for layer in self._layers:
+            cached = self._cache.get(layer.name)
+            if cached is None:
+                cached = layer.selections(*visible)
+                self._cache[layer.name] = cached
+            selections.extend(cached)
+        self.editor.setExtraSelections(selections)
@@ -0,0 +1,60 @@
+import zlib
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+def content_hash(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+class DirtyTracker(QObject):
+    """Флаг «файл изменён» без сравнения всего текста на каждое нажатие.
+
+    Основной источник — modificationChanged документа: Qt сам снимает флаг,
+    когда отмена (undo) возвращает документ к сохранённой точке. Хэш
+    содержимого считается только если текст мог вернуться к сохранённому
+    вручную — то есть когда его длина снова совпала с сохранённой.
+    """
+
+    dirty_changed = pyqtSignal(bool)
+
+    HASH_CHECK_DELAY = 300
+
+    def __init__(self, document, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.is_dirty = False
+        self._saved_length = document.characterCount()
+        self._saved_hash = content_hash(document.toPlainText())
+
+        self._hash_timer = QTimer(self)
+        self._hash_timer.setSingleShot(True)
+        self._hash_timer.timeout.connect(self._check_hash)
+
+        document.modificationChanged.connect(self._set_dirty)
+        document.contentsChange.connect(self._on_contents_change)
+
+    def mark_saved(self, text):
+        """Текущее содержимое (``text``) записано на диск или только что загружено."""
+        self._saved_length = self.document.characterCount()
+        self._saved_hash = content_hash(text)
+        self._hash_timer.stop()
+        self.document.setModified(False)
+        self._set_dirty(False)
+
+    def _set_dirty(self, dirty):
+        if dirty == self.is_dirty:
+            return
+        self.is_dirty = dirty
+        self.dirty_changed.emit(dirty)
+
+    def _on_contents_change(self, position, removed, added):
+        if self.is_dirty and self.document.characterCount() == self._saved_length:
+            self._hash_timer.start(self.HASH_CHECK_DELAY)
+
+    def _check_hash(self):
+        if not self.is_dirty or self.document.characterCount() != self._saved_length:
+            return
+        if content_hash(self.document.toPlainText()) == self._saved_hash:
+            # Текст совпал с сохранённым — делаем текущую точку «чистой»
+            self.document.setModified(False)
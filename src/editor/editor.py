@@ -1,12 +1,17 @@
-from PyQt6.QtWidgets import QPlainTextEdit, QTextEdit
-from PyQt6.QtCore import QTimer, QRect
-from PyQt6.QtGui import QTextCursor, QFont, QColor,QTextFormat,QTextCharFormat
-from pygments.lexers import get_lexer_for_filename
+from PyQt6.QtWidgets import QPlainTextEdit
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QTextCursor, QFont, QTextCharFormat
 from src.editor.syntax_hightlighter import ReliableSyntaxHighlighter
+from src.editor.lexer_registry import lexer_registry
 from src.editor.line_number import LineNumberArea
 from src.editor.auto_completer import CompleterMixin
 from src.editor.key_handling import KeyHandlingMixin
-import autopep8
+from src.editor.dirty_tracker import DirtyTracker
+from src.editor.decorations import (DecorationManager, CurrentLineLayer, DiagnosticLayer, MarkerLayer,
+                                    underline_format)
+from src.editor.markers import MarkerIndex
+from src.lsp.diagnostics import ERROR, WARNING, INFORMATION, HINT
+from src.formatter.format_worker import format_worker
 
 class OutputProxy:
     def __init__(self, text_edit):
@@ -22,20 +27,19 @@ class OutputProxy:
 class CodeEditor(QPlainTextEdit, CompleterMixin, KeyHandlingMixin):
     def __init__(self, parent=None, file_path=None):
         super().__init__(parent)
-        self.line_number_area = LineNumberArea(self)
-        self.breakpoints = set()
+        self.markers = MarkerIndex(self.document(), self)
         self.setup_editor()
         self.setup_completer()
         self.highlighter = ReliableSyntaxHighlighter(self.document())
+        self.highlighter.scheduler.set_view(self)
         self.file_path = file_path
+        self.dirty_tracker = DirtyTracker(self.document(), self)
         self.setup_line_number_area()
-        self.document().contentsChanged.connect(self.update_line_number_area)
+        self.setup_decorations()
         self.cursorPositionChanged.connect(self.highlight_current_line)
-        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
-
-        self.update_timer = QTimer(self)
-        self.update_timer.setSingleShot(True)
-        self.update_timer.timeout.connect(self.update_line_number_area)
+        self._formatting = False
+        format_worker.finished.connect(self.on_format_finished)
+        format_worker.failed.connect(self.on_format_failed)
 
         if file_path:
             self.set_lexer_by_filename(file_path)
@@ -71,12 +75,6 @@ class CodeEditor(QPlainTextEdit, CompleterMixin, KeyHandlingMixin):
 
         return super().eventFilter(obj, event)
 
-    def update_line_number_area(self):
-        self.line_number_area.update(0, 0, self.line_number_area.width(), self.height())
-
-    def on_scroll(self):
-        self.update_timer.start(100)
-
     def resizeEvent(self, event):
         super().resizeEvent(event)
         cr = self.contentsRect()
@@ -86,101 +84,84 @@ class CodeEditor(QPlainTextEdit, CompleterMixin, KeyHandlingMixin):
 
     def set_lexer_by_filename(self, filename):
         try:
-            lexer = get_lexer_for_filename(filename)
-            self.highlighter.set_lexer(lexer)
+            engine = lexer_registry.engine_for_filename(filename)
+            self.highlighter.set_engine(engine)
         except:
-            self.highlighter.set_lexer(None)
+            self.highlighter.set_engine(None)
 
     def format_code(self):
-        original_text = self.toPlainText()
-        try:
-            formatted = autopep8.fix_code(original_text)
-            if formatted.strip() != original_text.strip():
-                cursor = self.textCursor()
-                cursor.select(QTextCursor.SelectionType.Document)
-                cursor.removeSelectedText()
-                cursor.insertText(formatted)
-        except Exception as e:
-            print("Ошибка форматирования:", e)
+        # autopep8 считает в отдельном процессе; ответ — правки по строкам
+        if self._formatting:
+            return
+        self._formatting = True
+        format_worker.submit(self, self.toPlainText())
+
+    def on_format_finished(self, owner, source, hunks):
+        if owner is not self:
+            return
+        self._formatting = False
+        if self.toPlainText() != source:
+            print("Форматирование отменено: текст изменился, пока шёл autopep8")
+            return
+        self.apply_hunks(hunks)
+
+    def on_format_failed(self, owner, error):
+        if owner is not self:
+            return
+        self._formatting = False
+        print("Ошибка форматирования:", error)
+
+    def apply_hunks(self, hunks):
+        """Применить правки (start, end, text) одним шагом отмены.
+
+        Каждая правка — отдельный блок, присоединённый к первому: подсветка
+        получает contentsChange только по изменённым строкам, а курсор и
+        прокрутка пользователя остаются на месте.
+        """
+        cursor = QTextCursor(self.document())
+        for number, (start, end, text) in enumerate(reversed(hunks)):
+            if number == 0:
+                cursor.beginEditBlock()
+            else:
+                cursor.joinPreviousEditBlock()
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(text)
+            cursor.endEditBlock()
+
+    def setup_decorations(self):
+        self.decorations = DecorationManager(self)
+        # Тонкая полоска вместо фона всей строки
+        self.decorations.add_layer(CurrentLineLayer("current_line", "#3e4451", z=0))
+        self.decorations.add_layer(MarkerLayer("breakpoints", self.markers, "breakpoint", "#e06c75", z=10))
+        self.decorations.add_layer(MarkerLayer("debug_line", self.markers, "debug_line", "#4f5b67", z=20))  # Текущая исполняемая строка
+
+        self.decorations.add_layer(DiagnosticLayer("diagnostics", self.document(), {
+            ERROR: underline_format("#F44747"),
+            WARNING: underline_format("#CCA700"),
+            INFORMATION: underline_format("#3794FF"),
+            HINT: underline_format("#808080", QTextCharFormat.UnderlineStyle.DotLine),
+        }, z=40))
 
     def highlight_current_line(self):
-        extra_selections = []
+        self.decorations.invalidate("current_line")
 
-        if not self.isReadOnly():
-            selection = QTextEdit.ExtraSelection()
+    def set_diagnostics(self, index):
+        """index — DiagnosticIndex от языкового сервера или None."""
+        self.decorations.layer("diagnostics").set_index(index)
 
-            # Тонкая полоска вместо фона всей строки
-            line_format = QTextCharFormat()
-            line_format.setBackground(QColor("#3e4451"))  # Цвет полоски
-            line_format.setProperty(QTextFormat.Property.FullWidthSelection, True)
+    @property
+    def breakpoints(self):
+        # Номера строк с нуля, уже с учётом правок выше брейкпоинтов
+        return self.markers.lines("breakpoint")
 
-            selection.format = line_format
-            selection.cursor = self.textCursor()
-            selection.cursor.clearSelection()
-
-            extra_selections.append(selection)
-
-        self.setExtraSelections(extra_selections)
-    
     def toggle_breakpoint(self, line_number):
-        if line_number in self.breakpoints:
-            self.breakpoints.remove(line_number)
-        else:
-            self.breakpoints.add(line_number)
-        self.update_breakpoints()
-
-    def update_breakpoints(self):
-        extra_selections = []
-
-        for block_number in self.breakpoints:
-            block = self.document().findBlockByLineNumber(block_number)
-            if not block.isValid():
-                continue  # пропускаем невалидные блоки
-            cursor = QTextCursor(block)
-            fmt = QTextCharFormat()
-            fmt.setBackground(QColor("#e06c75"))
-            fmt.setProperty(QTextFormat.Property.FullWidthSelection, True)
-
-            selection = QTextEdit.ExtraSelection()
-            selection.cursor = cursor
-            selection.cursor.select(QTextCursor.SelectionType.LineUnderCursor)
-            selection.format = fmt
-            extra_selections.append(selection)
-
-        self.setExtraSelections(extra_selections)
-
-        self.setExtraSelections(extra_selections)
+        self.markers.toggle("breakpoint", line_number)
+
     def setup_line_number_area(self):
         self.line_number_area = LineNumberArea(self)
         self.line_number_area.line_clicked.connect(self.toggle_breakpoint)
-    
+
     def highlight_debug_line(self, line_number):
-        extra_selections = []
-
-        # Текущая исполняемая строка
-        selection = QTextEdit.ExtraSelection()
-        line_format = QTextCharFormat()
-        line_format.setBackground(QColor("#4f5b67"))  # Цвет текущей строки
-        line_format.setProperty(QTextFormat.Property.FullWidthSelection, True)
-
-        cursor = QTextCursor(self.document().findBlockByLineNumber(line_number))
-        selection.format = line_format
-        selection.cursor = cursor
-        selection.cursor.select(QTextCursor.SelectionType.LineUnderCursor)
-
-        extra_selections.append(selection)
-
-        # Существующие точки останова
-        for block_number in self.breakpoints:
-            cursor = QTextCursor(self.document().findBlockByLineNumber(block_number))
-            fmt = QTextCharFormat()
-            fmt.setBackground(QColor("#e06c75"))  # Красный цвет для брейкпоинта
-            fmt.setProperty(QTextFormat.Property.FullWidthSelection, True)
-
-            selection = QTextEdit.ExtraSelection()
-            selection.format = fmt
-            selection.cursor = cursor
-            selection.cursor.select(QTextCursor.SelectionType.LineUnderCursor)
-            extra_selections.append(selection)
-
-        self.setExtraSelections(extra_selections)
\ No newline at end of file
+        self.markers.clear("debug_line")
+        self.markers.add("debug_line", line_number)
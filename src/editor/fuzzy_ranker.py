@@ -0,0 +1,160 @@
+import re
+import string
+from itertools import count
+
+
+# Буквы, цифры и '_' получают по своему биту, остальное делит последние
+_CHAR_BITS = {char: 1 << bit for bit, char in enumerate(string.ascii_lowercase + string.digits + '_')}
+_OTHER_BITS = 64 - len(_CHAR_BITS)
+
+
+def char_mask(text):
+    """Битовая маска символов строки (без учёта регистра).
+
+    Кандидат может совпасть с запросом, только если в его маске есть все
+    биты маски запроса — большинство отсеивается одной операцией &.
+    """
+    mask = 0
+    for char in text.lower():
+        bit = _CHAR_BITS.get(char)
+        if bit is None:
+            bit = 1 << (len(_CHAR_BITS) + ord(char) % _OTHER_BITS)
+        mask |= bit
+    return mask
+
+
+def humps(name):
+    """Первые буквы частей идентификатора: getValueOf -> gvo, read_csv -> rc."""
+    result = [name[:1]]
+    previous = name[:1]
+    for char in name[1:]:
+        if (char.isupper() and not previous.isupper()) or (previous == '_' and char != '_'):
+            result.append(char)
+        previous = char
+    return ''.join(result).lower()
+
+
+class FuzzyIndex:
+    """Нечёткий поиск по списку кандидатов автодополнения.
+
+    Кандидаты один раз сортируются (короткие выше) и для каждого считаются
+    маска символов и «горбы». Запрос раскладывает совпадения по уровням:
+    префикс с учётом регистра, префикс без регистра, совпадение по горбам,
+    подстрока, подпоследовательность. Внутри уровня сохраняется исходный
+    порядок, так что сортировать на каждое нажатие не нужно. Если запрос
+    продолжает предыдущий, перебираются только его совпадения.
+    """
+
+    def __init__(self, recent=None):
+        self.recent = recent if recent is not None else RecentNames()
+        self.set_candidates([])
+
+    def set_candidates(self, names):
+        names = sorted(set(names), key=lambda n: (len(n), n.lower(), n))
+        self.names = names
+        self._lowered = [n.lower() for n in names]
+        self._masks = [char_mask(n) for n in names]
+        self._humps = [humps(n) for n in names]
+        self._positions = {n: i for i, n in enumerate(names)}
+        self._last_query = None
+        self._last_matches = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def filter(self, query):
+        """Индексы кандидатов, подходящих под ``query``, от лучшего к худшему."""
+        if not query:
+            return list(range(len(self.names)))
+        lowered_query = query.lower()
+        if self._last_query and lowered_query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self.names))
+
+        query_mask = char_mask(query)
+        masks = self._masks
+        lowered = self._lowered
+        if len(lowered_query) == 1 and lowered_query in _CHAR_BITS:
+            # Для одного символа маска уже точный ответ
+            matched = [i for i in candidates if masks[i] & query_mask]
+        else:
+            subsequence = re.compile('.*?'.join(map(re.escape, lowered_query))).search
+            matched = [i for i in candidates
+                       if masks[i] & query_mask == query_mask and subsequence(lowered[i])]
+        self._last_query = lowered_query
+        self._last_matches = matched
+
+        tiers = self._split_tiers(matched, query, lowered_query)
+        recent = [self._positions[n] for n in self.recent.names() if n in self._positions]
+        if recent:
+            matched_query = re.compile('.*?'.join(map(re.escape, lowered_query))).search
+            recent = [i for i in recent if matched_query(lowered[i])]
+        if recent:
+            tiers = self._boost_recent(tiers, recent, query, lowered_query)
+        exact, prefix, hump, substring, rest = tiers
+        return exact + prefix + hump + substring + rest
+
+    def _split_tiers(self, matched, query, lowered_query):
+        lowered = self._lowered
+        hump_list = self._humps
+        exact, prefix, hump, substring, rest = [], [], [], [], []
+        add_exact, add_prefix, add_hump = exact.append, prefix.append, hump.append
+        add_substring, add_rest = substring.append, rest.append
+        names = self.names
+        for i in matched:
+            name = lowered[i]
+            if name.startswith(lowered_query):
+                if names[i].startswith(query):
+                    add_exact(i)
+                else:
+                    add_prefix(i)
+            elif hump_list[i].startswith(lowered_query):
+                add_hump(i)
+            elif lowered_query in name:
+                add_substring(i)
+            else:
+                add_rest(i)
+        return [exact, prefix, hump, substring, rest]
+
+    def _boost_recent(self, tiers, recent, query, lowered_query):
+        # Недавно выбранные поднимаются в начало своего уровня; уровень
+        # считаем только для них, а не строим множества по всем совпадениям
+        boosted = [[] for _ in tiers]
+        for i in recent:
+            for level, tier in enumerate(self._split_tiers([i], query, lowered_query)):
+                if tier:
+                    boosted[level].append(i)
+                    break
+        result = []
+        for level, tier in enumerate(tiers):
+            if boosted[level]:
+                boosted_set = set(boosted[level])
+                tier = boosted[level] + [i for i in tier if i not in boosted_set]
+            result.append(tier)
+        return result
+
+
+class RecentNames:
+    """Недавно выбранные варианты, от свежих к старым."""
+
+    LIMIT = 100
+
+    def __init__(self):
+        self._order = {}
+        self._counter = count()
+
+    def note(self, name):
+        self._order[name] = next(self._counter)
+        if len(self._order) > self.LIMIT:
+            oldest = min(self._order, key=self._order.get)
+            del self._order[oldest]
+
+    def names(self):
+        return sorted(self._order, key=self._order.get, reverse=True)
+
+
+recent_completions = RecentNames()
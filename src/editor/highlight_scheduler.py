@@ -0,0 +1,130 @@
+import time
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QTextCursor
+
+
+class HighlightScheduler(QObject):
+    """Откладывает подсветку больших вставок (открытие файла, вставка из буфера).
+
+    Пока есть отложенная работа, подсвечивается только видимая область, а
+    остальной документ докрашивается порциями из цикла событий. Точки, с
+    которых надо продолжить, хранятся как QTextCursor, поэтому они сами
+    сдвигаются при правках пользователя.
+    """
+
+    LARGE_CHANGE_BLOCKS = 2000  # изменения больше этого уходят в фон
+    CHUNK_BLOCKS = 200          # блоков за один вызов rehighlightBlock
+    EDIT_BLOCKS = 200           # сколько блоков может перекрасить правка, пока идёт фон
+    SLICE_MS = 8                # сколько времени занимать у цикла событий за раз
+    DEFAULT_VISIBLE_BLOCKS = 100
+
+    def __init__(self, highlighter, document):
+        super().__init__(highlighter)
+        self.highlighter = highlighter
+        self.document = document
+        self.view = None
+        self._pending = []
+        self._driving = False
+
+        self._slice_timer = QTimer(self)
+        self._slice_timer.setSingleShot(True)
+        self._slice_timer.timeout.connect(self._run_slice)
+
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.timeout.connect(self._highlight_visible)
+
+        # Подключаемся раньше самого QSyntaxHighlighter, чтобы успеть
+        # выставить бюджет до того, как Qt начнёт перекрашивать блоки
+        document.contentsChange.connect(self._on_contents_change)
+
+    def set_view(self, editor):
+        self.view = editor
+        editor.verticalScrollBar().valueChanged.connect(self._schedule_visible)
+
+    def rehighlight(self):
+        if self.document.blockCount() <= self.LARGE_CHANGE_BLOCKS:
+            self.cancel()
+            self.highlighter.rehighlight()
+            return
+
+        self.cancel()
+        self._pending.append(QTextCursor(self.document.begin()))
+        self._highlight_visible()
+        self._slice_timer.start(0)
+
+    def cancel(self):
+        self._pending.clear()
+        self._slice_timer.stop()
+        self._visible_timer.stop()
+        self.highlighter.set_budget(None)
+        self.highlighter.take_skipped()
+
+    def _on_contents_change(self, position, removed, added):
+        # Свои прогоны rehighlightBlock планировщик не перепланирует
+        if self._driving:
+            return
+
+        first = self.document.findBlock(position).blockNumber()
+        last = self.document.findBlock(max(position, position + added - 1)).blockNumber()
+        if last - first > self.LARGE_CHANGE_BLOCKS:
+            # Новая большая правка отменяет всю старую фоновую работу
+            self.cancel()
+            self.highlighter.set_budget(self._visible_count())
+            self._visible_timer.start(0)
+            self._slice_timer.start(0)
+        else:
+            self._collect_skipped()
+            if not self._pending:
+                return
+            self.highlighter.set_budget(self.EDIT_BLOCKS)
+            self._slice_timer.start(0)
+
+    def _schedule_visible(self):
+        if self._pending:
+            self._visible_timer.start(0)
+
+    def _highlight_visible(self):
+        self._collect_skipped()
+        if not self._pending:
+            return
+        block = self.view.firstVisibleBlock() if self.view else self.document.begin()
+        self._drive(block, self._visible_count())
+
+    def _run_slice(self):
+        self._collect_skipped()
+        deadline = time.perf_counter() + self.SLICE_MS / 1000
+        while self._pending and time.perf_counter() < deadline:
+            cursor = min(self._pending, key=lambda c: c.position())
+            self._pending.remove(cursor)
+            self._drive(cursor.block(), self.CHUNK_BLOCKS)
+
+        if self._pending:
+            self._slice_timer.start(0)
+        else:
+            self.highlighter.set_budget(None)
+
+    def _drive(self, block, budget):
+        if not block.isValid():
+            return
+        self._driving = True
+        try:
+            self.highlighter.set_budget(budget)
+            self.highlighter.rehighlightBlock(block)
+        finally:
+            self._driving = False
+        self._collect_skipped()
+
+    def _collect_skipped(self):
+        cursor = self.highlighter.take_skipped()
+        if cursor is not None:
+            self._pending.append(cursor)
+
+    def _visible_count(self):
+        if self.view is None:
+            return self.DEFAULT_VISIBLE_BLOCKS
+        # Пока виджет не показан, у viewport ещё нет настоящего размера
+        line_height = max(1, self.view.fontMetrics().height())
+        visible = self.view.viewport().height() // line_height + 2
+        return max(visible, self.DEFAULT_VISIBLE_BLOCKS)
@@ -0,0 +1,92 @@
+import os
+import re
+import threading
+from collections import Counter
+
+import jedi
+
+
+ROOT_MARKERS = ('.git', 'pyproject.toml', 'setup.py', 'setup.cfg', 'requirements.txt')
+SKIP_DIRS = {'__pycache__', 'node_modules', 'venv', 'env', 'build', 'dist', 'site-packages'}
+MAX_SCANNED_FILES = 500
+PRELOAD_MODULES = 20
+
+_IMPORT_RE = re.compile(r'^[ \t]*(?:from[ \t]+(\w+)[\w.]*[ \t]+import|import[ \t]+([\w., \t]+))', re.M)
+
+
+class ProjectCache:
+    """Один jedi.Project на корень рабочей папки.
+
+    Проект хранит настройки окружения и sys.path; пересоздавать его на
+    каждый запрос — значит каждый раз заново искать интерпретатор.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roots = {}     # папка файла -> корень
+        self._projects = {}  # корень -> jedi.Project
+
+    def root_for(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        root = self._roots.get(directory)
+        if root is None:
+            root = find_workspace_root(directory)
+            self._roots[directory] = root
+        return root
+
+    def project_for(self, path):
+        """Проект для файла ``path`` (или для самой папки); None для безымянного буфера."""
+        if not path:
+            return None
+        root = path if os.path.isdir(path) else self.root_for(path)
+        with self._lock:
+            project = self._projects.get(root)
+            if project is None:
+                project = jedi.Project(root)
+                self._projects[root] = project
+            return project
+
+
+def find_workspace_root(directory):
+    current = directory
+    while True:
+        if any(os.path.exists(os.path.join(current, marker)) for marker in ROOT_MARKERS):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return directory
+        current = parent
+
+
+def common_imports(root, limit=PRELOAD_MODULES):
+    """Самые часто импортируемые в проекте внешние модули верхнего уровня."""
+    local = {os.path.splitext(name)[0] for name in os.listdir(root)}
+    counts = Counter()
+    scanned = 0
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+        for name in files:
+            if not name.endswith('.py'):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8', errors='ignore') as f:
+                    source = f.read()
+            except OSError:
+                continue
+            for from_name, import_names in _IMPORT_RE.findall(source):
+                if from_name:
+                    counts[from_name] += 1
+                else:
+                    for item in import_names.split(','):
+                        module = item.split()[0].split('.')[0] if item.split() else ''
+                        if module:
+                            counts[module] += 1
+            scanned += 1
+            if scanned >= MAX_SCANNED_FILES:
+                break
+        if scanned >= MAX_SCANNED_FILES:
+            break
+    return [name for name, _ in counts.most_common() if name not in local][:limit]
+
+
+project_cache = ProjectCache()
@@ -0,0 +1,117 @@
+import fnmatch
+import importlib
+import os
+import threading
+
+from pygments.lexers import LEXERS, get_lexer_by_name
+from pygments.plugin import find_plugin_lexers
+
+from src.editor.python_tokenizer import PythonTokenizer
+from src.editor.syntax_hightlighter import PygmentsEngine
+
+
+class LexerRegistry:
+    """Выбор движка подсветки по имени файла.
+
+    Таблицы расширений строятся один раз (лениво или в фоне через
+    warm_up), а лексеры и движки создаются по одному на класс и
+    раздаются всем редакторам: лексеры pygments не хранят состояния.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_extension = None   # '.ext' -> [(module, class_name), ...]
+        self._patterns = None       # [(pattern, module, class_name), ...]
+        self._plugin_lexers = None
+        self._overrides = {}        # '.ext' -> имя лексера, класс или экземпляр
+        self._engines = {}          # имя файла -> движок
+        self._lexer_engines = {}    # класс лексера -> PygmentsEngine
+        self._python_engine = PythonTokenizer()
+
+    def warm_up(self):
+        thread = threading.Thread(target=self._build, name="lexer-registry", daemon=True)
+        thread.start()
+        return thread
+
+    def register_override(self, extension, lexer):
+        """Принудительно использовать ``lexer`` для файлов с расширением ``extension``.
+
+        ``lexer`` — алиас pygments ('html'), класс или экземпляр лексера.
+        """
+        if not extension.startswith('.'):
+            extension = '.' + extension
+        with self._lock:
+            self._overrides[extension.lower()] = lexer
+            self._engines.clear()
+
+    def engine_for_filename(self, filename):
+        basename = os.path.basename(filename)
+        engine = self._engines.get(basename)
+        if engine is None and basename not in self._engines:
+            with self._lock:
+                engine = self._resolve(basename)
+                self._engines[basename] = engine
+        return engine
+
+    def _resolve(self, basename):
+        extension = os.path.splitext(basename)[1].lower()
+        if extension in self._overrides:
+            return self._engine_for_lexer(self._overrides[extension])
+        if PythonTokenizer.handles(basename):
+            return self._python_engine
+
+        self._build()
+        extension = os.path.splitext(basename)[1]
+        candidates = [
+            (self._load_class(module, class_name), '*' + extension)
+            for module, class_name in self._by_extension.get(extension, ())
+        ]
+        candidates += [
+            (self._load_class(module, class_name), pattern)
+            for pattern, module, class_name in self._patterns
+            if fnmatch.fnmatch(basename, pattern)
+        ]
+        candidates += [
+            (cls, pattern)
+            for cls in self._plugin_lexers
+            for pattern in cls.filenames
+            if fnmatch.fnmatch(basename, pattern)
+        ]
+        if not candidates:
+            return None
+        # Как и pygments: больший priority, точное имя файла важнее маски
+        best, _ = max(candidates, key=lambda c: c[0].priority + (0 if '*' in c[1] else 0.5))
+        return self._engine_for_lexer(best)
+
+    def _engine_for_lexer(self, lexer):
+        if isinstance(lexer, str):
+            lexer = type(get_lexer_by_name(lexer))
+        cls = lexer if isinstance(lexer, type) else type(lexer)
+        engine = self._lexer_engines.get(cls)
+        if engine is None:
+            engine = PygmentsEngine(lexer if not isinstance(lexer, type) else cls())
+            self._lexer_engines[cls] = engine
+        return engine
+
+    def _load_class(self, module, class_name):
+        return getattr(importlib.import_module(module), class_name)
+
+    def _build(self):
+        with self._lock:
+            if self._by_extension is not None:
+                return
+            by_extension = {}
+            patterns = []
+            for class_name, (module, _, _, filenames, _) in LEXERS.items():
+                for pattern in filenames:
+                    extension = pattern[1:]
+                    if pattern.startswith('*.') and not any(c in extension for c in '*?['):
+                        by_extension.setdefault(extension, []).append((module, class_name))
+                    else:
+                        patterns.append((pattern, module, class_name))
+            self._plugin_lexers = list(find_plugin_lexers())
+            self._patterns = patterns
+            self._by_extension = by_extension
+
+
+lexer_registry = LexerRegistry()
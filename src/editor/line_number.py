@@ -1,58 +1,127 @@
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtGui import QPainter, QColor, QFont
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QFont, QPixmap
+from PyQt6.QtCore import Qt, pyqtSignal, QEvent, QRect, QTimer
 
 class LineNumberArea(QWidget):
     line_clicked = pyqtSignal(int)
 
+    PADDING = 15
+    RIGHT_MARGIN = 5
+
     def  __init__(self, editor, background="#1e1e1e", color="#abb2bf", current_color="#ffffff"):
         super().__init__(editor)
         self.editor = editor
         self.background = QColor(background)
         self.color = QColor(color)
         self.current_color = QColor(current_color)
+        self._digits = 0
+        self._width = 0
+        self._current_block = -1
+
+        # Несколько сигналов курсора за один проход цикла событий — одна перерисовка
+        self._cursor_timer = QTimer(self)
+        self._cursor_timer.setSingleShot(True)
+        self._cursor_timer.timeout.connect(self._repaint_current_line)
+
         self.editor.blockCountChanged.connect(self.update_width)
-        self.editor.cursorPositionChanged.connect(self.update)
-        self.editor.verticalScrollBar().valueChanged.connect(self.update)
-        self.update_width()
+        self.editor.cursorPositionChanged.connect(self._cursor_timer.start)
+        self.editor.updateRequest.connect(self.on_update_request)
+        self.editor.installEventFilter(self)
+        self.refresh_metrics()
 
     def width(self):
-        block_count = max(1, self.editor.document().blockCount())
-        max_line_number = len(str(block_count))
-        widest_text = '9' * max_line_number
-        width = self.editor.fontMetrics().horizontalAdvance(widest_text) + 15
-        return width
+        return self._width
+
+    def refresh_metrics(self):
+        metrics = self.editor.fontMetrics()
+        self._line_height = metrics.height()
+        self._ascent = metrics.ascent()
+        self._digit_width = max(metrics.horizontalAdvance(str(d)) for d in range(10))
+        self._glyphs = {
+            False: self._render_digits(self.color),
+            True: self._render_digits(self.current_color),
+        }
+        self._digits = 0
+        self.update_width()
+
+    def _render_digits(self, color):
+        # Цифры рисуем один раз в pixmap, дальше номера строк только копируются
+        ratio = self.devicePixelRatioF()
+        glyphs = []
+        for digit in range(10):
+            pixmap = QPixmap(int(self._digit_width * ratio), int(self._line_height * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(self.editor.font())
+            painter.setPen(color)
+            painter.drawText(0, self._ascent, str(digit))
+            painter.end()
+            glyphs.append(pixmap)
+        return glyphs
 
     def update_width(self):
-        self.setFixedWidth(self.width())
-        self.editor.setViewportMargins(self.width(), 0, 0, 0)
+        digits = len(str(max(1, self.editor.document().blockCount())))
+        if digits == self._digits:
+            return
+        self._digits = digits
+        self._width = self._digit_width * digits + self.PADDING
+        self.setFixedWidth(self._width)
+        self.editor.setViewportMargins(self._width, 0, 0, 0)
         self.update()
 
+    def on_update_request(self, rect, dy):
+        if dy:
+            self.scroll(0, dy)
+        else:
+            self.update(0, rect.y(), self._width, rect.height())
+
+    def _repaint_current_line(self):
+        block = self.editor.textCursor().block()
+        previous = self._current_block
+        self._current_block = block.blockNumber()
+        if previous == self._current_block:
+            return
+        self._update_block(block)
+        if previous >= 0:
+            self._update_block(self.editor.document().findBlockByNumber(previous))
+
+    def _update_block(self, block):
+        if not block.isValid():
+            return
+        geometry = self.editor.blockBoundingGeometry(block).translated(self.editor.contentOffset())
+        if geometry.bottom() >= 0 and geometry.top() <= self.height():
+            self.update(QRect(0, int(geometry.top()), self._width, int(geometry.height()) + 1))
+
+    def eventFilter(self, obj, event):
+        if obj is self.editor and event.type() == QEvent.Type.FontChange:
+            self.refresh_metrics()
+        return super().eventFilter(obj, event)
+
     def paintEvent(self, event):
-        super().paintEvent(event)
         painter = QPainter(self)
-        painter.fillRect(event.rect(), self.background)
         rect = event.rect()
-        cursor = self.editor.textCursor()
-        current_block = cursor.block() if cursor is not None else None
+        painter.fillRect(rect, self.background)
+        current_block = self.editor.textCursor().blockNumber()
+        self._current_block = current_block
 
         block = self.editor.firstVisibleBlock()
         top = self.editor.blockBoundingGeometry(block).translated(self.editor.contentOffset()).top()
-        bottom = top + self.editor.blockBoundingRect(block).height()
         block_number = block.blockNumber()
+        right = self._width - self.RIGHT_MARGIN
 
         while block.isValid() and top <= rect.bottom():
+            bottom = top + self.editor.blockBoundingRect(block).height()
             if block.isVisible() and bottom >= rect.top():
+                glyphs = self._glyphs[block_number == current_block]
                 number = str(block_number + 1)
-                painter.setPen(self.current_color if block == current_block else self.color)
-                painter.drawText(
-                    0, int(top), self.width() - 5,
-                    self.editor.fontMetrics().height(),
-                    Qt.AlignmentFlag.AlignRight, number
-                )
+                x = right - len(number) * self._digit_width
+                y = int(top)
+                for char in number:
+                    painter.drawPixmap(x, y, glyphs[ord(char) - 48])
+                    x += self._digit_width
             block = block.next()
             top = bottom
-            bottom = top + self.editor.blockBoundingRect(block).height()
             block_number += 1
 
     def mousePressEvent(self, event):
@@ -67,4 +136,4 @@ class LineNumberArea(QWidget):
                     break
                 block = block.next()
                 top = bottom
-                bottom = top + self.editor.blockBoundingRect(block).height()
\ No newline at end of file
+                bottom = top + self.editor.blockBoundingRect(block).height()
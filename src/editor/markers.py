@@ -0,0 +1,104 @@
+from bisect import bisect_left, bisect_right
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QTextCursor
+
+
+class MarkerIndex(QObject):
+    """Метки на строках (брейкпоинты, закладки, ...), переживающие правки.
+
+    Каждая метка — QTextCursor в начале своей строки: документ сам сдвигает
+    курсоры при вставке и удалении текста, поэтому номера строк не
+    пересчитываются проходом по документу. Отсортированные номера строк
+    кэшируются по виду метки до следующего изменения текста.
+    """
+
+    changed = pyqtSignal(str)  # вид метки
+
+    def __init__(self, document, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self._anchors = {}  # вид -> [(QTextCursor, data), ...]
+        self._sorted = {}   # вид -> ([строки], [data])
+        self._block_count = document.blockCount()
+        document.contentsChange.connect(self._on_contents_change)
+
+    def add(self, kind, line, data=None):
+        if self.has(kind, line):
+            return False
+        block = self.document.findBlockByNumber(line)
+        if not block.isValid():
+            return False
+        self._anchors.setdefault(kind, []).append((QTextCursor(block), data))
+        self._sorted.pop(kind, None)
+        self.changed.emit(kind)
+        return True
+
+    def remove(self, kind, line):
+        anchors = self._anchors.get(kind, [])
+        kept = [a for a in anchors if a[0].blockNumber() != line]
+        if len(kept) == len(anchors):
+            return False
+        self._anchors[kind] = kept
+        self._sorted.pop(kind, None)
+        self.changed.emit(kind)
+        return True
+
+    def toggle(self, kind, line):
+        """Возвращает True, если метка поставлена, и False, если снята."""
+        if self.remove(kind, line):
+            return False
+        return self.add(kind, line)
+
+    def clear(self, kind):
+        if self._anchors.pop(kind, None):
+            self._sorted.pop(kind, None)
+            self.changed.emit(kind)
+
+    def has(self, kind, line):
+        lines, _ = self._lines(kind)
+        index = bisect_left(lines, line)
+        return index < len(lines) and lines[index] == line
+
+    def lines(self, kind):
+        """Отсортированные номера строк (с нуля) для меток вида ``kind``."""
+        return list(self._lines(kind)[0])
+
+    def in_range(self, kind, first, last):
+        """Метки вида ``kind`` на строках first..last: [(line, data), ...]."""
+        lines, data = self._lines(kind)
+        start = bisect_left(lines, first)
+        end = bisect_right(lines, last)
+        return list(zip(lines[start:end], data[start:end]))
+
+    def _lines(self, kind):
+        cached = self._sorted.get(kind)
+        if cached is not None:
+            return cached
+        anchors = self._anchors.get(kind, [])
+        pairs = []
+        unique = []
+        seen = set()
+        for cursor, data in anchors:
+            line = cursor.blockNumber()
+            # Строку с меткой удалили — курсор съехал на соседнюю, где
+            # такая метка уже может быть
+            if line in seen:
+                continue
+            seen.add(line)
+            unique.append((cursor, data))
+            pairs.append((line, data))
+        if len(unique) != len(anchors):
+            self._anchors[kind] = unique
+        pairs.sort(key=lambda p: p[0])
+        cached = ([p[0] for p in pairs], [p[1] for p in pairs])
+        self._sorted[kind] = cached
+        return cached
+
+    def _on_contents_change(self, position, removed, added):
+        # Смена форматов подсветки (removed == added) строки не сдвигает
+        block_count = self.document.blockCount()
+        if removed == added and block_count == self._block_count:
+            return
+        self._block_count = block_count
+        self._sorted.clear()
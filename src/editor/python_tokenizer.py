@@ -0,0 +1,151 @@
+import keyword
+import os
+import re
+
+from pygments.token import Token
+
+
+# Состояния в конце строки: внутри какой многострочной строки мы остались
+NORMAL = 0
+IN_SINGLE = 1      # '''
+IN_DOUBLE = 2      # """
+IN_SINGLE_DOC = 3  # ''' docstring
+IN_DOUBLE_DOC = 4  # """ docstring
+
+_CLOSE_RE = {
+    IN_SINGLE: re.compile(r"(?:[^'\\]|\\.|'(?!''))*'''"),
+    IN_DOUBLE: re.compile(r'(?:[^"\\]|\\.|"(?!""))*"""'),
+}
+_CLOSE_RE[IN_SINGLE_DOC] = _CLOSE_RE[IN_SINGLE]
+_CLOSE_RE[IN_DOUBLE_DOC] = _CLOSE_RE[IN_DOUBLE]
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>\#.*)
+  | (?P<triple>(?i:[rbuf]{0,2})(?:'''|\"\"\"))
+  | (?P<string>(?i:[rbuf]{0,2})(?:'(?:[^'\\]|\\.)*'?|"(?:[^"\\]|\\.)*"?))
+  | (?P<number>0[xX][0-9a-fA-F_]+|0[bB][01_]+|0[oO][0-7_]+
+      |(?:\d[\d_]*(?:\.[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d+)?[jJ]?)
+  | (?P<decorator>@[^\W\d][\w.]*)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>[-+*/%&|^~<>=!@:]+|\.)
+  | (?P<punct>.)
+""", re.VERBOSE)
+
+_WORD_TYPES = {word: Token.Keyword for word in keyword.kwlist}
+_WORD_TYPES.update({
+    'import': Token.Keyword.Namespace,
+    'from': Token.Keyword.Namespace,
+    'True': Token.Keyword.Constant,
+    'False': Token.Keyword.Constant,
+    'None': Token.Keyword.Constant,
+    'and': Token.Operator.Word,
+    'or': Token.Operator.Word,
+    'not': Token.Operator.Word,
+    'in': Token.Operator.Word,
+    'is': Token.Operator.Word,
+    'self': Token.Name.Builtin.Pseudo,
+    'cls': Token.Name.Builtin.Pseudo,
+})
+
+_GROUP_TYPES = {
+    'comment': Token.Comment.Single,
+    'string': Token.String,
+    'number': Token.Number,
+    'decorator': Token.Name.Decorator,
+    'op': Token.Operator,
+    'punct': Token.Punctuation,
+}
+
+# Имя после def/class получает свой тип
+_DEFINITION_TYPES = {
+    'def': Token.Name.Function,
+    'class': Token.Name.Class,
+}
+
+
+class PythonTokenizer:
+    """Быстрый разборщик Python для подсветки без pygments.
+
+    Одно регулярное выражение на строку и небольшой автомат для
+    многострочных строк. Типы токенов — те же, что у pygments, поэтому
+    подсветчик использует для них общую таблицу стилей.
+    """
+
+    EXTENSIONS = ('.py', '.pyw', '.pyi')
+    initial_state = NORMAL
+    token_types = tuple(set(_WORD_TYPES.values()) | set(_GROUP_TYPES.values())
+                        | set(_DEFINITION_TYPES.values())
+                        | {Token.Name, Token.String.Doc})
+
+    @classmethod
+    def handles(cls, filename):
+        return os.path.splitext(filename)[1].lower() in cls.EXTENSIONS
+
+    def tokenize(self, text, state=NORMAL):
+        """Возвращает ``([(start, length, token_type), ...], end_state)``."""
+        tokens = []
+        pos = 0
+        length = len(text)
+
+        if state != NORMAL:
+            m = _CLOSE_RE[state].match(text)
+            string_type = Token.String.Doc if state >= IN_SINGLE_DOC else Token.String
+            if not m:
+                if length:
+                    tokens.append((0, length, string_type))
+                return tokens, state
+            pos = m.end()
+            tokens.append((0, pos, string_type))
+
+        last_type = None
+        previous_word = None
+        at_line_start = pos == 0
+
+        match = _TOKEN_RE.match
+        while pos < length:
+            m = match(text, pos)
+            group = m.lastgroup
+            start = pos
+            pos = m.end()
+            if group == 'ws':
+                continue
+
+            if group == 'name':
+                word = m.group()
+                if previous_word in _DEFINITION_TYPES:
+                    token_type = _DEFINITION_TYPES[previous_word]
+                else:
+                    token_type = _WORD_TYPES.get(word, Token.Name)
+                previous_word = word
+            elif group == 'triple':
+                token_type = Token.String.Doc if at_line_start else Token.String
+                double = m.group()[-1] == '"'
+                close = _CLOSE_RE[IN_DOUBLE if double else IN_SINGLE].match(text, pos)
+                if close is None:
+                    if double:
+                        state = IN_DOUBLE_DOC if at_line_start else IN_DOUBLE
+                    else:
+                        state = IN_SINGLE_DOC if at_line_start else IN_SINGLE
+                    tokens.append((start, length - start, token_type))
+                    return tokens, state
+                pos = close.end()
+                previous_word = None
+            elif group == 'decorator' and not at_line_start:
+                # a@b — это оператор матричного умножения
+                token_type = Token.Operator
+                pos = start + 1
+            else:
+                token_type = _GROUP_TYPES[group]
+                previous_word = None
+
+            at_line_start = False
+            if token_type is last_type:
+                # Соседние токены одного типа склеиваем: пробелы между ними
+                # не видно, а setFormat вызывается реже
+                tokens[-1] = (tokens[-1][0], pos - tokens[-1][0], token_type)
+            else:
+                tokens.append((start, pos - start, token_type))
+            last_type = token_type
+
+        return tokens, NORMAL
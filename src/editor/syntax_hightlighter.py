@@ -1,12 +1,148 @@
-from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QFont, QColor
+from PyQt6.QtGui import QSyntaxHighlighter, QTextBlockUserData, QTextCharFormat, QFont, QColor, QTextCursor
 from PyQt6.QtCore import QSize 
-from pygments.token import Token, Name, Keyword, String, Number, Operator, Punctuation, Comment, Literal, Generic
+from pygments.lexer import RegexLexer
+from pygments.token import Token, Name, Keyword, String, Number, Operator, Punctuation, Comment, Literal, Generic, Error, _TokenType
+from src.editor.highlight_scheduler import HighlightScheduler
+
+
+ROOT_STACK = ('root',)
+
+
+def lex_line(lexer, text, stack=ROOT_STACK):
+    """Лексит одну строку, начиная со стека состояний ``stack``.
+
+    Повторяет цикл ``RegexLexer.get_tokens_unprocessed``, но дополнительно
+    возвращает стек, с которым строка закончилась, чтобы следующий блок
+    мог продолжить разбор конструкций, которые лексер ведёт отдельным
+    состоянием (например, строки в тройных кавычках).
+
+    Ограничение: правило, у которого одно регулярное выражение захватывает
+    несколько строк (``/* ... */`` в C/JS, ``<!-- ... -->`` в HTML,
+    ``(?:.|\n)*?`` у docstring в PythonLexer), здесь видит только свою
+    строку и не срабатывает. Такая конструкция разбирается по строкам
+    как обычный код: многострочный комментарий C теряет подсветку
+    комментария, docstring выходит ``String.Double``, а не ``String.Doc``.
+    Исправить это построчно нельзя — вид блока зависел бы от следующих
+    строк. Python-файлы идут через PythonTokenizer и этого не касаются.
+    """
+    tokens = []
+    pos = 0
+    tokendefs = lexer._tokens
+    statestack = list(stack)
+    statetokens = tokendefs[statestack[-1]]
+    text += '\n'
+    while 1:
+        for rexmatch, action, new_state in statetokens:
+            m = rexmatch(text, pos)
+            if m:
+                if action is not None:
+                    if type(action) is _TokenType:
+                        tokens.append((pos, action, m.group()))
+                    else:
+                        tokens.extend(action(lexer, m))
+                pos = m.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == '#pop':
+                                if len(statestack) > 1:
+                                    statestack.pop()
+                            elif state == '#push':
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack):
+                            del statestack[1:]
+                        else:
+                            del statestack[new_state:]
+                    elif new_state == '#push':
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+        else:
+            if pos >= len(text):
+                break
+            if text[pos] == '\n':
+                # Конец строки без совпадения — как и pygments, сбрасываем в root
+                statestack = ['root']
+                statetokens = tokendefs['root']
+                pos += 1
+                continue
+            tokens.append((pos, Error, text[pos]))
+            pos += 1
+    return tokens, tuple(statestack)
+
+
+def is_resumable(lexer):
+    return (
+        isinstance(lexer, RegexLexer)
+        and type(lexer).get_tokens_unprocessed is RegexLexer.get_tokens_unprocessed
+    )
+
+
+class PygmentsEngine:
+    """Обёртка над лексером pygments с тем же интерфейсом, что у PythonTokenizer."""
+
+    initial_state = ROOT_STACK
+    token_types = ()
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.resumable = is_resumable(lexer)
+
+    def tokenize(self, text, state=ROOT_STACK):
+        if self.resumable:
+            raw_tokens, state = lex_line(self.lexer, text, state)
+        else:
+            raw_tokens, state = self._lex_stateless(text), ROOT_STACK
+
+        tokens = []
+        text_length = len(text)
+        for pos, token_type, value in raw_tokens:
+            length = len(value)
+            if length and pos < text_length:
+                tokens.append((pos, length, token_type))
+        return tokens, state
+
+    def _lex_stateless(self, text):
+        tokens = []
+        pos = 0
+        for token_type, value in self.lexer.get_tokens(text):
+            tokens.append((pos, token_type, value))
+            pos += len(value)
+        return tokens
+
+
+class SemanticLine(QTextBlockUserData):
+    """Семантические токены блока и текст, для которого их прислал сервер."""
+
+    def __init__(self, text, spans):
+        super().__init__()
+        self.text = text
+        self.spans = spans  # ((начало, длина, QTextCharFormat), ...)
 
 
 class ReliableSyntaxHighlighter(QSyntaxHighlighter):
+    SEMANTIC_BULK_BLOCKS = 200  # больше — перекрашиваем через планировщик порциями
+
     def __init__(self, document):
-        super().__init__(document)
+        super().__init__(None)
         self.lexer = None
+        self.engine = None
+        # Состояния движка, общие для всех блоков: в блоке хранится
+        # только номер состояния (setCurrentBlockState). Номера не переиспользуются
+        # между движками, чтобы старые состояния никогда не совпали с новыми.
+        self._states = {}
+        self._state_ids = {}
+        self._next_state_id = 0
+        # Сколько блоков ещё можно подсветить в текущем проходе (None — без
+        # ограничений) и блок, на котором проход остановился
+        self._budget = None
+        self._skipped = None
+        self.scheduler = HighlightScheduler(self, document)
+        self.setParent(document)
+        self.setDocument(document)
         self.styles = {
             Token.Keyword: self.create_format('#569CD6', bold=True),         # Голубые ключевые слова
             Token.Keyword.Namespace: self.create_format('#4EC9B0'),           # Например, 'import'
@@ -35,6 +171,30 @@ class ReliableSyntaxHighlighter(QSyntaxHighlighter):
         }
 
         self.default_format = self.create_format('#D4D4D4') 
+        # Тип токена -> готовый формат, цепочка родителей разбирается один раз
+        self._formats = {}
+
+        # Семантические токены LSP поверх лексических: только то, что
+        # лексер различить не может
+        self.semantic_styles = {
+            'namespace': self.create_format('#4EC9B0'),
+            'class': self.create_format('#4EC9B0', bold=True),
+            'type': self.create_format('#4EC9B0'),
+            'typeParameter': self.create_format('#4EC9B0'),
+            'enum': self.create_format('#4EC9B0'),
+            'parameter': self.create_format('#9CDCFE', italic=True),
+            'variable': self.create_format('#9CDCFE'),
+            'property': self.create_format('#9CDCFE'),
+            'enumMember': self.create_format('#4FC1FF'),
+            'function': self.create_format('#DCDCAA'),
+            'method': self.create_format('#DCDCAA'),
+            'decorator': self.create_format('#C586C0'),
+            'macro': self.create_format('#569CD6'),
+        }
+        self.readonly_format = self.create_format('#4FC1FF')
+        self._semantic_types = []
+        self._readonly_bit = 0
+        self._semantic_formats = {}
 
     def create_format(self, color=None, bold=False, italic=False):
         fmt = QTextCharFormat()
@@ -47,33 +207,135 @@ class ReliableSyntaxHighlighter(QSyntaxHighlighter):
         return fmt
 
     def highlightBlock(self, text):
-        if not self.lexer:
+        if self._budget is not None:
+            if self._budget <= 0:
+                if self._skipped is None:
+                    self._skipped = QTextCursor(self.currentBlock())
+                return
+            self._budget -= 1
+
+        if self.engine is None:
             return
-            
+
+        previous_state = self.previousBlockState()
+        state = self._states.get(previous_state, self.engine.initial_state)
+
         try:
-            tokens = list(self.lexer.get_tokens(text))
+            tokens, end_state = self.engine.tokenize(text, state)
         except Exception as e:
             print("Lexer error:", str(e))
             return
-            
-        pos = 0
-        for token_type, value in tokens:
-            length = len(value)
-            if not length:
-                continue
-                
-            # Найдём совпадение стиля
-            fmt = self.default_format
-            current_type = token_type
-            while current_type not in self.styles and current_type.parent:
-                current_type = current_type.parent
-
-            if current_type in self.styles:
-                fmt = self.styles[current_type]
-            
+
+        formats = self._formats
+        for pos, length, token_type in tokens:
+            fmt = formats.get(token_type)
+            if fmt is None:
+                fmt = self._resolve_format(token_type)
             self.setFormat(pos, length, fmt)
-            pos += length
+
+        semantic = self.currentBlockUserData()
+        # После правки строки старые токены не годятся — до ответа сервера
+        # остаётся только лексическая подсветка
+        if semantic is not None and semantic.text == text:
+            for pos, length, fmt in semantic.spans:
+                self.setFormat(pos, length, fmt)
+
+        # Если конечное состояние блока не изменилось, Qt не пойдёт
+        # перекрашивать следующие блоки — правка стоит пару строк.
+        self.setCurrentBlockState(self._state_id(end_state))
+
+    def _resolve_format(self, token_type):
+        # Найдём совпадение стиля
+        current_type = token_type
+        while current_type not in self.styles and current_type.parent:
+            current_type = current_type.parent
+        fmt = self.styles.get(current_type, self.default_format)
+        self._formats[token_type] = fmt
+        return fmt
+
+    def _state_id(self, state):
+        state_id = self._state_ids.get(state)
+        if state_id is None:
+            state_id = self._next_state_id
+            self._next_state_id += 1
+            self._states[state_id] = state
+            self._state_ids[state] = state_id
+        return state_id
+
+    def set_semantic_legend(self, token_types, token_modifiers):
+        self._semantic_types = list(token_types)
+        self._readonly_bit = 1 << token_modifiers.index('readonly') if 'readonly' in token_modifiers else 0
+        self._semantic_formats = {}
+
+    def apply_semantic_tokens(self, first_line, last_line, rows):
+        """Наложить токены строк first_line..last_line (None — до конца документа).
+
+        ``rows`` — {строка: ((начало, длина, тип, модификаторы), ...)}.
+        Перекрашиваются только блоки, у которых токены действительно
+        поменялись.
+        """
+        document = self.document()
+        if last_line is None:
+            last_line = document.blockCount() - 1
+        changed = []
+        block = document.findBlockByNumber(first_line)
+        line = first_line
+        while block.isValid() and line <= last_line:
+            spans = self._semantic_spans(rows.get(line, ()))
+            old = block.userData()
+            text = block.text()
+            if spans:
+                if old is None or old.spans != spans or old.text != text:
+                    block.setUserData(SemanticLine(text, spans))
+                    changed.append(block)
+            elif old is not None:
+                block.setUserData(None)
+                changed.append(block)
+            block = block.next()
+            line += 1
+
+        if len(changed) > self.SEMANTIC_BULK_BLOCKS:
+            self.scheduler.rehighlight()
+        else:
+            for block in changed:
+                self.rehighlightBlock(block)
+
+    def _semantic_spans(self, tokens):
+        spans = []
+        for start, length, token_type, modifiers in tokens:
+            key = (token_type, bool(modifiers & self._readonly_bit))
+            fmt = self._semantic_formats.get(key, False)
+            if fmt is False:
+                fmt = self._semantic_format(*key)
+                self._semantic_formats[key] = fmt
+            if fmt is not None:
+                spans.append((start, length, fmt))
+        return tuple(spans)
+
+    def _semantic_format(self, token_type, readonly):
+        if token_type >= len(self._semantic_types):
+            return None
+        name = self._semantic_types[token_type]
+        if readonly and name in ('variable', 'property'):
+            return self.readonly_format
+        return self.semantic_styles.get(name)
+
+    def set_budget(self, budget):
+        self._budget = budget
+
+    def take_skipped(self):
+        skipped, self._skipped = self._skipped, None
+        return skipped
 
     def set_lexer(self, lexer):
+        self.set_engine(PygmentsEngine(lexer) if lexer is not None else None)
         self.lexer = lexer
-        self.rehighlight()  # Обновляем подсветку при смене лексера
\ No newline at end of file
+
+    def set_engine(self, engine):
+        self.engine = engine
+        self.lexer = None
+        self._states = {}
+        self._state_ids = {}
+        for token_type in getattr(engine, 'token_types', ()):
+            self._resolve_format(token_type)
+        self.scheduler.rehighlight()  # Обновляем подсветку при смене лексера
\ No newline at end of file
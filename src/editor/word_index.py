@@ -0,0 +1,145 @@
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import chain
+
+from PyQt6.QtCore import QObject
+
+_WORD_RE = re.compile(r'[^\W\d]\w{2,}')
+_LAST = '\U0010ffff'
+
+
+class WordIndex:
+    """Слова всех открытых документов для запасного автодополнения.
+
+    Хранит число вхождений каждого слова и отсортированный без учёта
+    регистра список слов, так что поиск по префиксу — два двоичных поиска.
+    Работает для любого языка и не ждёт jedi.
+    """
+
+    MAX_SCANNED = 2000
+    BULK = 64
+
+    def __init__(self):
+        self._counts = Counter()
+        self._sorted = []  # [(слово в нижнем регистре, слово), ...]
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, words):
+        counts = self._counts
+        new = []
+        for word, n in Counter(words).items():
+            count = counts.get(word, 0)
+            counts[word] = count + n
+            if not count:
+                new.append((word.lower(), word))
+        if len(new) > self.BULK:
+            # Загрузка файла: одна сортировка вместо тысяч вставок
+            self._sorted = sorted(self._sorted + new)
+        else:
+            for item in new:
+                insort(self._sorted, item)
+
+    def remove(self, words):
+        counts = self._counts
+        gone = []
+        for word, n in Counter(words).items():
+            count = counts.get(word, 0) - n
+            if count > 0:
+                counts[word] = count
+            elif word in counts:
+                del counts[word]
+                gone.append((word.lower(), word))
+        if len(gone) > self.BULK:
+            gone = set(gone)
+            self._sorted = [item for item in self._sorted if item not in gone]
+        else:
+            for item in gone:
+                del self._sorted[bisect_left(self._sorted, item)]
+
+    def complete(self, prefix, limit=50):
+        """Слова, начинающиеся с ``prefix``; частые выше."""
+        lowered = prefix.lower()
+        low = bisect_left(self._sorted, (lowered,))
+        high = bisect_left(self._sorted, (lowered + _LAST,), low, min(len(self._sorted), low + self.MAX_SCANNED))
+        counts = self._counts
+        words = [word for _, word in self._sorted[low:high]
+                 # Само набираемое слово, если больше его нигде нет, не предлагаем
+                 if not (word == prefix and counts[word] <= 1)]
+        words.sort(key=lambda w: (-counts[w], len(w)))
+        return words[:limit]
+
+
+class DocumentWords(QObject):
+    """Вклад одного документа в WordIndex, обновляемый по изменённым блокам.
+
+    Для каждого блока хранится кортеж его слов; правка пересчитывает только
+    затронутые блоки и вычитает из общего индекса их старые слова. Хэш
+    текста блока отсекает contentsChange, в которых сменились только
+    форматы: на них регулярное выражение не запускается.
+    """
+
+    BULK_BLOCKS = 500
+
+    def __init__(self, document, index, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.index = index
+        self._blocks = []
+        self._hashes = []
+        block = document.begin()
+        while block.isValid():
+            text = block.text()
+            self._blocks.append(tuple(_WORD_RE.findall(text)))
+            self._hashes.append(hash(text))
+            block = block.next()
+        index.add(chain.from_iterable(self._blocks))
+        document.contentsChange.connect(self._on_contents_change)
+        # К моменту уничтожения документа этот объект (ребёнок редактора)
+        # может быть уже удалён, поэтому замыкание держит сам список блоков
+        blocks = self._blocks
+        document.destroyed.connect(lambda *_: _forget(index, blocks))
+
+    def _on_contents_change(self, position, removed, added):
+        document = self.document
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not last.isValid():
+            last = document.lastBlock()
+        first_number = first.blockNumber()
+        last_number = last.blockNumber()
+        delta = document.blockCount() - len(self._blocks)
+
+        if last_number - first_number > self.BULK_BLOCKS:
+            # Вставка большого текста: один toPlainText быстрее обхода блоков
+            lines = document.toPlainText().split('\n')[first_number:last_number + 1]
+        else:
+            lines = []
+            block = first
+            for _ in range(last_number - first_number + 1):
+                lines.append(block.text())
+                block = block.next()
+
+        start, stop = first_number, last_number - delta + 1
+        hashes = [hash(line) for line in lines]
+        if hashes == self._hashes[start:stop]:
+            return  # символы те же, сменились только форматы
+        self._hashes[start:stop] = hashes
+
+        findall = _WORD_RE.findall
+        new_words = [tuple(findall(line)) for line in lines]
+        old_words = self._blocks[start:stop]
+        self._blocks[start:stop] = new_words
+        if old_words != new_words:
+            self.index.remove(chain.from_iterable(old_words))
+            self.index.add(chain.from_iterable(new_words))
+
+
+def _forget(index, blocks):
+    index.remove(chain.from_iterable(blocks))
+    blocks.clear()
+
+
+word_index = WordIndex()
@@ -10,6 +10,7 @@ from src.main_window.title_bar import TitleBar
 
 class FileExplorer(QFrame):
     file_tree_changed = pyqtSignal()
+    root_changed = pyqtSignal(str)
 
     def __init__(self, file_open_callback, parent=None, title_bar = None):
         super().__init__(parent)
@@ -40,9 +41,11 @@ class FileExplorer(QFrame):
 
     def setRootPath(self, path):
         if os.path.isdir(path):
+            self.root_path = path
             self.model.setRootPath(path)
             self.tree.setModel(self.model)
             self.tree.setRootIndex(self.model.index(path))
+            self.root_changed.emit(path)
 
     def setup_model(self):
         self.model = QFileSystemModel()
@@ -75,6 +78,7 @@ class FileExplorer(QFrame):
         self.setup_model()                     
         self.tree.setModel(self.model)         
         self.tree.setRootIndex(self.model.index(self.root_path)) 
+        self.root_changed.emit(folder_path)
 
         if self.title_bar:
             self.title_bar.set_current_directory(folder_path) 
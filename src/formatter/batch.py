@@ -0,0 +1,98 @@
+"""Форматирование файлов проекта без Qt: функции для пула процессов и кэш."""
+import hashlib
+import json
+import os
+
+import autopep8
+
+SKIP_DIRS = {'__pycache__', 'node_modules', 'venv', 'env', 'build', 'dist', 'site-packages'}
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'rdv-ide', 'format')
+
+
+def config_key(options):
+    """Версия autopep8 и опции: другой ключ — кэш недействителен целиком."""
+    payload = json.dumps({'autopep8': autopep8.__version__, 'options': options or {}}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def python_files(root):
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+        for name in files:
+            if name.endswith(('.py', '.pyw', '.pyi')):
+                yield os.path.join(directory, name)
+
+
+def format_file(path, options=None):
+    """Отформатировать файл на месте; (путь, изменён ли, хэш результата)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    source = data.decode('utf-8')
+    formatted = autopep8.fix_code(source, options=options)
+    if formatted == source:
+        return path, False, content_hash(data)
+    encoded = formatted.encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(encoded)
+    return path, True, content_hash(encoded)
+
+
+class FormatCache:
+    """Что в проекте уже отформатировано при текущих настройках.
+
+    Для файла хранятся mtime, размер и хэш содержимого после форматирования.
+    Совпали mtime и размер — файл даже не читается; иначе сверяется хэш.
+    Лежит в ~/.cache/rdv-ide/format, по файлу на корень проекта.
+    """
+
+    def __init__(self, root, options=None):
+        self.root = os.path.abspath(root)
+        self.key = config_key(options)
+        name = hashlib.sha1(self.root.encode('utf-8')).hexdigest() + '.json'
+        self.path = os.path.join(CACHE_DIR, name)
+        self.entries = {}  # путь относительно корня -> [mtime_ns, size, hash]
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('config') == self.key:
+            self.entries = data.get('files', {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'config': self.key, 'files': self.entries}, f)
+        os.replace(temporary, self.path)
+
+    def is_formatted(self, path, stat):
+        """True, если файл не менялся с последнего форматирования."""
+        entry = self.entries.get(os.path.relpath(path, self.root))
+        if entry is None:
+            return False
+        mtime, size, digest = entry
+        if mtime == stat.st_mtime_ns and size == stat.st_size:
+            return True
+        if size != stat.st_size:
+            return False
+        # mtime сдвинулся (git checkout, touch) — сверяем содержимое
+        try:
+            with open(path, 'rb') as f:
+                if content_hash(f.read()) != digest:
+                    return False
+        except OSError:
+            return False
+        self.mark(path, digest)
+        return True
+
+    def mark(self, path, digest):
+        stat = os.stat(path)
+        self.entries[os.path.relpath(path, self.root)] = [stat.st_mtime_ns, stat.st_size, digest]
@@ -0,0 +1,46 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src.formatter.hunks import format_source
+
+
+class FormatWorker(QObject):
+    """autopep8 в отдельном процессе, чтобы форматирование не держало GUI.
+
+    Процесс создаётся при первом запросе и живёт до выхода. Результат —
+    список правок по строкам (см. hunks.line_hunks), а не весь текст.
+    """
+
+    finished = pyqtSignal(object, str, object)  # владелец, исходный текст, правки
+    failed = pyqtSignal(object, str)
+
+    def __init__(self):
+        super().__init__()
+        self._executor = None
+
+    def submit(self, owner, source, options=None):
+        if self._executor is None:
+            # spawn: fork процесса с запущенным Qt небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        future = self._executor.submit(format_source, source, options)
+        # Колбэк приходит в служебном потоке пула; сигнал доставится в GUI-поток
+        future.add_done_callback(lambda f: self._done(owner, source, f))
+
+    def _done(self, owner, source, future):
+        try:
+            hunks, _ = future.result()
+        except Exception as e:
+            self.failed.emit(owner, str(e))
+            return
+        self.finished.emit(owner, source, hunks)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+format_worker = FormatWorker()
@@ -0,0 +1,52 @@
+"""Форматирование без Qt: выполняется в отдельном процессе."""
+import difflib
+
+import autopep8
+
+
+def line_hunks(old, new):
+    """Правки, превращающие ``old`` в ``new``, по целым строкам.
+
+    Возвращает [(start, end, text), ...] по возрастанию. Позиции — как в
+    QTextDocument, в единицах UTF-16: символ вне BMP (эмодзи) занимает
+    две. Применять правки нужно с конца, чтобы позиции не съезжали.
+    """
+    old_lines = old.split('\n')
+    new_lines = new.split('\n')
+    offsets = [0]
+    for line in old_lines:
+        offsets.append(offsets[-1] + _utf16_len(line) + 1)
+    length = offsets[-1] - 1
+
+    hunks = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        start, end = offsets[i1], offsets[i2]
+        text = ''.join(line + '\n' for line in new_lines[j1:j2])
+        # У последней строки нет '\n' — правка, задевшая конец текста,
+        # переносит перевод строки на другую сторону
+        if start > length:
+            start = end = length
+            text = '\n' + text[:-1]
+        elif end > length:
+            end = length
+            if text:
+                text = text[:-1]
+            elif start > 0:
+                start -= 1
+        hunks.append((start, end, text))
+    return hunks
+
+
+def _utf16_len(text):
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le', 'surrogatepass')) // 2
+
+
+def format_source(source, options=None):
+    """autopep8 + построчный дифф; (hunks, отформатированный текст)."""
+    formatted = autopep8.fix_code(source, options=options)
+    return line_hunks(source, formatted), formatted
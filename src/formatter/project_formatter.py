@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from src.formatter.batch import FormatCache, format_file, python_files
+
+
+class ProjectFormatter(QObject):
+    """Format Project: autopep8 по всем .py под корнем в пуле процессов.
+
+    Обход и ожидание пула идут в фоновом потоке, прогресс приходит
+    сигналами. Файлы, которые не менялись с прошлого прогона при тех же
+    настройках, отсекает FormatCache — повторный запуск почти ничего не
+    читает с диска.
+    """
+
+    started = pyqtSignal(int)              # файлов к форматированию
+    progress = pyqtSignal(int, int, str)   # готово, всего, путь
+    finished = pyqtSignal(int, int, list, bool)  # изменено, по кэшу, [(путь, ошибка)], отменён
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._running = False
+        self._cancelled = False
+
+    def is_running(self):
+        return self._running
+
+    def start(self, root, skip=(), options=None):
+        """``skip`` — пути, которые форматируются в открытых редакторах."""
+        if self.is_running():
+            return False
+        self._running = True
+        self._cancelled = False
+        threading.Thread(target=self._run, args=(root, set(skip), options),
+                         name="format-project", daemon=True).start()
+        return True
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _run(self, root, skip, options):
+        cache = FormatCache(root, options)
+        todo = []
+        cached = 0
+        for path in python_files(root):
+            # Обход большого дерева сам по себе долгий — отмена действует и здесь
+            if self._cancelled:
+                break
+            if path in skip:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if cache.is_formatted(path, stat):
+                cached += 1
+            else:
+                todo.append(path)
+
+        changed = 0
+        errors = []
+        if self._cancelled:
+            todo = []
+        self.started.emit(len(todo))
+        if todo:
+            workers = min(len(todo), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {pool.submit(format_file, path, options): path for path in todo}
+                for done, future in enumerate(as_completed(futures), 1):
+                    if self._cancelled:
+                        for pending in futures:
+                            pending.cancel()
+                        break
+                    path = futures[future]
+                    try:
+                        _, was_changed, digest = future.result()
+                        cache.mark(path, digest)
+                        changed += was_changed
+                    except Exception as e:
+                        errors.append((path, str(e)))
+                    self.progress.emit(done, len(todo), path)
+
+        try:
+            cache.save()
+        except OSError as e:
+            errors.append((cache.path, f"Не удалось сохранить кэш форматирования: {e}"))
+        # Сбрасываем до сигнала: обработчик finished может сразу запустить новый прогон
+        self._running = False
+        self.finished.emit(changed, cached, errors, self._cancelled)
+
+
+project_formatter = ProjectFormatter()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class IOLoop(QObject):
+    """Цикл asyncio в отдельном потоке и мост от него к GUI.
+
+    Qt-цикл остаётся главным: сокеты и процессы (LSP, DAP) живут в цикле
+    asyncio своего потока и не зависят от таймеров опроса. Из GUI корутины
+    запускаются через ``submit``; колбэк результата и ``call_in_gui``
+    выполняются уже в GUI-потоке через сигнал с очередью.
+    """
+
+    _deliver = pyqtSignal(object, object)  # функция, аргументы
+
+    def __init__(self):
+        super().__init__()
+        self._loop = None
+        self._thread = None
+        self._deliver.connect(self._on_deliver)
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="io-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def submit(self, coro, callback=None):
+        """Запустить корутину в цикле; ``callback(result)`` вызовется в GUI."""
+        if self._loop is None:
+            coro.close()
+            return None
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(lambda f: self._done(f, callback))
+        return future
+
+    def call_in_gui(self, function, *args):
+        """Из потока цикла: выполнить ``function(*args)`` в GUI-потоке."""
+        self._deliver.emit(function, args)
+
+    def _done(self, future, callback):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"[IO]: Ошибка в фоновой задаче: {error!r}")
+        elif callback is not None:
+            self._deliver.emit(callback, (future.result(),))
+
+    def _on_deliver(self, function, args):
+        function(*args)
+
+    def stop(self, timeout=2.0):
+        """Отменить незавершённые задачи и остановить поток цикла."""
+        if self._thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop).result(timeout)
+        except Exception as e:
+            print(f"[IO]: Задачи не остановились: {e!r}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop = None
+
+    async def _cancel_tasks(self):
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._loop.shutdown_asyncgens()
+
+
+io_loop = IOLoop()
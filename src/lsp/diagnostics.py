@@ -0,0 +1,121 @@
+from bisect import bisect_left, bisect_right
+
+ERROR = 1
+WARNING = 2
+INFORMATION = 3
+HINT = 4
+
+
+class DiagnosticIndex:
+    """Диагностики одного документа, разложенные по строкам.
+
+    Элемент — кортеж (line, character, end_line, end_character, severity,
+    message) в координатах LSP. Однострочные диагностики (почти все)
+    лежат отсортированными по строке и ищутся двоичным поиском;
+    многострочных обычно единицы, их перебираем. Индекс не меняется
+    после создания, поэтому его можно строить в потоке io_loop и
+    читать из GUI.
+    """
+
+    MAX_EDITS = 32
+
+    def __init__(self, items=()):
+        single = []
+        multi = []
+        for item in items:
+            (multi if item[2] > item[0] else single).append(item)
+        single.sort(key=lambda d: (d[0], d[1]))
+        self._set(single, multi)
+
+    def _set(self, single, multi):
+        self._single = single
+        self._lines = [d[0] for d in single]
+        self._multi = multi
+        self._edits = ()  # ((line, delta), ...) после построения
+
+    @classmethod
+    def from_lsp(cls, diagnostics):
+        items = []
+        for diagnostic in diagnostics:
+            start = diagnostic["range"]["start"]
+            end = diagnostic["range"]["end"]
+            items.append((start["line"], start["character"], end["line"], end["character"],
+                          diagnostic.get("severity", ERROR), diagnostic.get("message", "")))
+        return cls(items)
+
+    def __len__(self):
+        return len(self._single) + len(self._multi)
+
+    def in_lines(self, first, last):
+        """Диагностики, задевающие строки first..last (в текущих номерах)."""
+        low, high = first, last
+        for line, delta in reversed(self._edits):
+            low = _first_source(low, line, delta)
+            high = _last_source(high, line, delta)
+        start = bisect_left(self._lines, low)
+        end = bisect_right(self._lines, high)
+        found = self._single[start:end]
+        found.extend(d for d in self._multi if d[0] <= high and d[2] >= low)
+        if not self._edits:
+            return found
+        result = []
+        for d in found:
+            d = self._move(d)
+            if d[0] <= last and d[2] >= first:
+                result.append(d)
+        return result
+
+    def shifted(self, line, delta):
+        """Индекс после вставки (delta > 0) или удаления строк сразу за ``line``.
+
+        Сдвиг не переписывает все элементы, а запоминается и применяется
+        к найденным при запросе. Диагностики с удалённых строк
+        прижимаются к ``line`` — до следующего publishDiagnostics они
+        хотя бы не уезжают на чужой код.
+        """
+        index = DiagnosticIndex.__new__(DiagnosticIndex)
+        edits = self._edits + ((line, delta),)
+        if len(edits) <= self.MAX_EDITS:
+            index._single, index._lines, index._multi, index._edits = self._single, self._lines, self._multi, edits
+            return index
+        # Сервер давно не присылал новый список — применяем сдвиги разом
+        index._edits = edits
+        single = sorted((index._move(d) for d in self._single), key=lambda d: (d[0], d[1]))
+        multi = [index._move(d) for d in self._multi]
+        index._set(single, multi)
+        return index
+
+    def _move(self, d):
+        start, end = d[0], d[2]
+        for line, delta in self._edits:
+            start = _move_line(start, line, delta)
+            end = _move_line(end, line, delta)
+        return (start, d[1], end) + d[3:]
+
+
+def _move_line(n, line, delta):
+    if n <= line:
+        return n
+    if delta < 0 and n <= line - delta:
+        return line
+    return n + delta
+
+
+def _first_source(n, line, delta):
+    """Наименьшая строка до правки, попавшая после неё на n или ниже."""
+    if n <= line:
+        return n
+    if delta > 0:
+        return max(line + 1, n - delta)
+    return n - delta
+
+
+def _last_source(n, line, delta):
+    """Наибольшая строка до правки, попавшая после неё на n или выше."""
+    if delta > 0:
+        if n <= line:
+            return n
+        return max(line, n - delta)
+    if n < line:
+        return n
+    return n - delta
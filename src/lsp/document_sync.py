@@ -0,0 +1,149 @@
+import asyncio
+import os
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from src.lsp.lsp_client import TEXT_SYNC_FULL, TEXT_SYNC_INCREMENTAL, file_uri
+
+
+class DocumentSync(QObject):
+    """didOpen/didChange/didClose одного QTextDocument для языкового сервера.
+
+    Держит копию строк документа в том виде, в каком её знает сервер.
+    По contentsChange сравнивает затронутые строки с копией и шлёт только
+    отличающийся кусок текста; правки за один проход цикла событий
+    уходят одним didChange. Создаётся после client.initialize().
+
+    ``schedule`` запускает корутину клиента в его цикле asyncio.
+    """
+
+    BULK_BLOCKS = 500
+
+    changed = pyqtSignal()  # ушёл didChange с новой версией
+
+    def __init__(self, client, document, path, language_id='python', schedule=asyncio.ensure_future,
+                 parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.document = document
+        self.uri = file_uri(path)
+        self.version = 0
+        self._schedule = schedule
+        self._sync_kind = client.text_sync_kind()
+        self._changes = []
+        self._lines = document.toPlainText().split('\n')
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+        schedule(client.did_open(self.uri, language_id, self.version, '\n'.join(self._lines)))
+        self._closed = False
+        document.contentsChange.connect(self._on_contents_change)
+        document.destroyed.connect(self._on_destroyed)
+
+    @staticmethod
+    def language_for(path):
+        return 'python' if os.path.splitext(path)[1] in ('.py', '.pyw', '.pyi') else 'plaintext'
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.document.contentsChange.disconnect(self._on_contents_change)
+        self.flush()
+        if self.client.is_running:
+            self._schedule(self.client.did_close(self.uri))
+
+    def flush(self):
+        self._timer.stop()
+        if not self._changes:
+            return
+        if self._sync_kind == TEXT_SYNC_INCREMENTAL:
+            changes = self._changes
+        else:
+            changes = [{"text": '\n'.join(self._lines)}]
+        self._changes = []
+        self.version += 1
+        if self.client.is_running:
+            self._schedule(self.client.did_change(self.uri, self.version, changes))
+            self.changed.emit()
+
+    def _on_destroyed(self, *_):
+        if not self._closed:
+            self._closed = True
+            if self.client.is_running:
+                self._schedule(self.client.did_close(self.uri))
+
+    def _on_contents_change(self, position, removed, added):
+        if self._sync_kind not in (TEXT_SYNC_FULL, TEXT_SYNC_INCREMENTAL):
+            return
+        document = self.document
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not last.isValid():
+            last = document.lastBlock()
+        first_number = first.blockNumber()
+        last_number = last.blockNumber()
+        delta = document.blockCount() - len(self._lines)
+
+        if last_number - first_number > self.BULK_BLOCKS:
+            new = document.toPlainText().split('\n')[first_number:last_number + 1]
+        else:
+            new = []
+            block = first
+            for _ in range(last_number - first_number + 1):
+                new.append(block.text())
+                block = block.next()
+
+        old = self._lines[first_number:last_number - delta + 1]
+        if old == new:
+            return  # сменились только форматы подсветки
+        self._lines[first_number:last_number - delta + 1] = new
+        self._changes.append(_line_change(first_number, old, new))
+        if not self._timer.isActive():
+            self._timer.start()
+
+
+def _line_change(first_line, old, new):
+    """Правка LSP, превращающая строки ``old`` в ``new`` начиная с ``first_line``.
+
+    Общие начало и конец отбрасываются, так что набор символа даёт
+    правку из одного символа, а не из целой строки.
+    """
+    old_text = '\n'.join(old)
+    new_text = '\n'.join(new)
+    limit = min(len(old_text), len(new_text))
+    # Сначала целыми строками (вставка большого фрагмента), потом посимвольно
+    count = min(len(old), len(new))
+    lead = 0
+    while lead < count and old[lead] == new[lead]:
+        lead += 1
+    trail = 0
+    while trail < count - lead and old[-1 - trail] == new[-1 - trail]:
+        trail += 1
+    prefix = min(sum(len(line) + 1 for line in old[:lead]), limit)
+    suffix = min(sum(len(line) + 1 for line in old[len(old) - trail:]), limit - prefix)
+    while prefix < limit and old_text[prefix] == new_text[prefix]:
+        prefix += 1
+    # Префикс мог дорасти до совпавшего по строкам хвоста: куски не должны
+    # перекрываться, иначе диапазон правки выворачивается
+    suffix = min(suffix, limit - prefix)
+    while suffix < limit - prefix and old_text[-1 - suffix] == new_text[-1 - suffix]:
+        suffix += 1
+    return {
+        "range": {
+            "start": _position(old_text, prefix, first_line),
+            "end": _position(old_text, len(old_text) - suffix, first_line),
+        },
+        "text": new_text[prefix:len(new_text) - suffix],
+    }
+
+
+def _position(text, offset, first_line):
+    line_start = text.rfind('\n', 0, offset) + 1
+    column = text[line_start:offset]
+    # LSP считает символы в UTF-16, как и QTextDocument
+    character = len(column) if column.isascii() else len(column.encode('utf-16-le', 'surrogatepass')) // 2
+    return {"line": first_line + text.count('\n', 0, offset), "character": character}
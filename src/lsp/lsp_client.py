@@ -1,13 +1,83 @@
 import asyncio
+import inspect
 import json
 import os
+from collections import defaultdict
+from pathlib import Path
+
+from src.lsp.diagnostics import DiagnosticIndex
+from src.lsp.semantic_tokens import SemanticTokens
+
+READ_CHUNK = 65536
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+TEXT_SYNC_NONE = 0
+TEXT_SYNC_FULL = 1
+TEXT_SYNC_INCREMENTAL = 2
+
+SEMANTIC_TOKEN_TYPES = [
+    "namespace", "type", "class", "enum", "interface", "struct", "typeParameter", "parameter",
+    "variable", "property", "enumMember", "event", "function", "method", "macro", "keyword",
+    "modifier", "comment", "string", "number", "regexp", "operator", "decorator",
+]
+SEMANTIC_TOKEN_MODIFIERS = [
+    "declaration", "definition", "readonly", "static", "deprecated", "abstract", "async",
+    "modification", "documentation", "defaultLibrary",
+]
+
+CLIENT_CAPABILITIES = {
+    "general": {"positionEncodings": ["utf-16"]},
+    "textDocument": {
+        "synchronization": {"dynamicRegistration": False, "didSave": False},
+        "completion": {"completionItem": {"snippetSupport": False}},
+        "publishDiagnostics": {"relatedInformation": False},
+        "semanticTokens": {
+            "requests": {"range": False, "full": {"delta": True}},
+            "tokenTypes": SEMANTIC_TOKEN_TYPES,
+            "tokenModifiers": SEMANTIC_TOKEN_MODIFIERS,
+            "formats": ["relative"],
+            "multilineTokenSupport": False,
+        },
+    },
+}
+
+
+def file_uri(file_path):
+    return Path(file_path).resolve().as_uri()
+
+
+class LSPError(Exception):
+    """Ответ сервера с полем error."""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(f"{message} ({code})")
+        self.code = code
+        self.data = data
+
 
 class LSPClient:
+    """JSON-RPC поверх stdin/stdout языкового сервера.
+
+    Один фоновый таск читает stdout блоками и режет его на сообщения;
+    ответы находят свой запрос по id в ``_pending``, уведомления сервера
+    уходят обработчикам из ``on_notification``. Поэтому запросы можно
+    слать параллельно — каждый ждёт только свой ответ.
+    """
+
     def __init__(self, server_command):
         self.server_command = server_command  # например ['pylsp', '--stdio']
         self.process = None
         self.is_running = False
         self.request_id = 0
+        self._pending = {}  # id -> Future
+        self._notification_handlers = defaultdict(list)
+        self._request_handlers = {}
+        self._tasks = []
+        self.server_capabilities = {}
+        self.diagnostics = {}  # uri -> DiagnosticIndex
+        self.semantic_tokens = {}  # uri -> SemanticTokens
+        self.on_notification("textDocument/publishDiagnostics", self._store_diagnostics)
 
     async def start(self):
         try:
@@ -18,6 +88,8 @@ class LSPClient:
                 stderr=asyncio.subprocess.PIPE,
             )
             self.is_running = True
+            self._tasks = [asyncio.create_task(self._read_loop()),
+                           asyncio.create_task(self._drain_stderr())]
             print("[LSP]: Сервер успешно запущен.")
         except FileNotFoundError as e:
             print(f"[Ошибка запуска сервера LSP]: {e}")
@@ -26,80 +98,250 @@ class LSPClient:
 
     async def stop(self):
         if self.process:
-            self.process.terminate()
-            await self.process.wait()
+            process = self.process
             self.process = None
             self.is_running = False
+            for task in self._tasks:
+                if task is not asyncio.current_task():
+                    task.cancel()
+            self._tasks = []
+            self._fail_pending(ConnectionError("Сервер LSP остановлен."))
+            if process.returncode is None:
+                process.terminate()
+            await process.wait()
             print("[LSP]: Сервер остановлен.")
 
+    async def initialize(self, root_path=None):
+        """Рукопожатие initialize/initialized; до него сервер не принимает документы."""
+        root_uri = file_uri(root_path) if root_path else None
+        params = {
+            "processId": os.getpid(),
+            "rootUri": root_uri,
+            "capabilities": CLIENT_CAPABILITIES,
+            "workspaceFolders": [{"uri": root_uri, "name": os.path.basename(root_path)}] if root_uri else None,
+        }
+        result = await self.request("initialize", params)
+        self.server_capabilities = (result or {}).get("capabilities", {})
+        await self.notify("initialized", {})
+        return self.server_capabilities
+
+    async def shutdown(self):
+        if self.is_running:
+            try:
+                await self.request("shutdown")
+                await self.notify("exit")
+            except (LSPError, ConnectionError) as e:
+                print(f"[LSP]: Ошибка при завершении сервера: {e}")
+        await self.stop()
+
+    def text_sync_kind(self):
+        sync = self.server_capabilities.get("textDocumentSync", TEXT_SYNC_NONE)
+        if isinstance(sync, dict):
+            return sync.get("change", TEXT_SYNC_NONE)
+        return sync
+
+    def semantic_legend(self):
+        """(типы, модификаторы) токенов сервера или None, если он их не умеет."""
+        provider = self.server_capabilities.get("semanticTokensProvider")
+        if not provider:
+            return None
+        legend = provider.get("legend", {})
+        return legend.get("tokenTypes", []), legend.get("tokenModifiers", [])
+
+    async def request_semantic_tokens(self, uri, all_rows=False):
+        """Обновить токены документа; результат — как у SemanticTokens.set_full.
+
+        Если сервер умеет delta и прошлый ответ есть, просим только правки.
+        ``all_rows`` — вернуть строки всего документа, а не только изменённые.
+        """
+        provider = self.server_capabilities.get("semanticTokensProvider") or {}
+        full = provider.get("full")
+        tokens = self.semantic_tokens.setdefault(uri, SemanticTokens())
+        params = {"textDocument": {"uri": uri}}
+        if tokens.result_id is not None and isinstance(full, dict) and full.get("delta"):
+            params["previousResultId"] = tokens.result_id
+            result = await self.request("textDocument/semanticTokens/full/delta", params)
+        else:
+            result = await self.request("textDocument/semanticTokens/full", params)
+        if not result:
+            return None
+        if "edits" in result:
+            changed = tokens.apply_delta(result)
+        else:
+            changed = tokens.set_full(result)
+        return tokens.all_rows() if all_rows else changed
+
+    async def did_open(self, uri, language_id, version, text):
+        await self.notify("textDocument/didOpen", {
+            "textDocument": {"uri": uri, "languageId": language_id, "version": version, "text": text}})
+
+    async def did_change(self, uri, version, changes):
+        await self.notify("textDocument/didChange", {
+            "textDocument": {"uri": uri, "version": version}, "contentChanges": changes})
+
+    async def did_close(self, uri):
+        self.semantic_tokens.pop(uri, None)
+        await self.notify("textDocument/didClose", {"textDocument": {"uri": uri}})
+
+    def on_notification(self, method, handler):
+        """handler(params) — функция или корутина."""
+        self._notification_handlers[method].append(handler)
+
+    def on_request(self, method, handler):
+        """Запросы сервера к клиенту; результат handler(params) уходит в ответ."""
+        self._request_handlers[method] = handler
+
     async def send(self, payload):
         if not self.is_running:
             print("[LSP]: Невозможно отправить данные — сервер не запущен.")
             return
-        
-        data = json.dumps(payload)
-        content_length = len(data.encode('utf-8'))
-        header = f"Content-Length: {content_length}\r\n\r\n"
-        
+
+        data = json.dumps(payload).encode('utf-8')
+        header = f"Content-Length: {len(data)}\r\n\r\n".encode('ascii')
+
         try:
-            self.process.stdin.write(header.encode('utf-8') + data.encode('utf-8'))
+            self.process.stdin.write(header + data)
             await self.process.stdin.drain()
         except Exception as e:
             print(f"[Ошибка отправки данных LSP]: {e}")
             await self.stop()
 
+    async def notify(self, method, params=None):
+        await self.send(_message({"jsonrpc": "2.0", "method": method}, params))
+
+    async def request(self, method, params=None):
+        """Отправить запрос и дождаться результата.
+
+        Отмена ожидающего таска шлёт серверу ``$/cancelRequest``.
+        """
+        if not self.is_running:
+            raise ConnectionError("Сервер LSP не запущен.")
+        self.request_id += 1
+        request_id = self.request_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.send(_message({"jsonrpc": "2.0", "id": request_id, "method": method}, params))
+            return await future
+        except asyncio.CancelledError:
+            # Отмена таска отменяет и future, так что ответа ещё не было
+            if self.is_running and (future.cancelled() or not future.done()):
+                await self.notify("$/cancelRequest", {"id": request_id})
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
     async def request_completion(self, text, line, column, file_path):
         if not self.is_running:
             print("[LSP]: Автодополнение недоступно — сервер не запущен.")
             return None
-        
-        self.request_id += 1
-        uri = f"file:///{file_path.replace('\\', '/')}"  # Используем путь к файлу
-        request = {
-            "jsonrpc": "2.0",
-            "id": self.request_id,
-            "method": "textDocument/completion",
-            "params": {
-                "textDocument": {"uri": uri},
-                "position": {"line": line, "character": column},
-                "context": {"triggerKind": 1}
-            }
+
+        params = {
+            "textDocument": {"uri": file_uri(file_path)},
+            "position": {"line": line, "character": column},
+            "context": {"triggerKind": 1}
         }
-        
-        await self.send(request)
-        
+
         try:
-            response = await self.read_response()
-            return response
-        except Exception as e:
+            return await self.request("textDocument/completion", params)
+        except (LSPError, ConnectionError) as e:
             print(f"[Ошибка получения ответа LSP]: {e}")
             return None
 
-    async def read_response(self):
-        if not self.is_running:
-            return None
-
+    async def _read_loop(self):
+        buffer = bytearray()
+        stdout = self.process.stdout
         try:
-            # Чтение заголовка
-            header = b""
-            while not header.endswith(b"\r\n\r\n"):
-                chunk = await self.process.stdout.read(1)
+            while True:
+                chunk = await stdout.read(READ_CHUNK)
                 if not chunk:
                     raise ConnectionError("Потеря связи с сервером LSP.")
-                header += chunk
+                buffer += chunk
+                # За одно чтение может прийти несколько сообщений или часть одного
+                while True:
+                    header_end = buffer.find(b"\r\n\r\n")
+                    if header_end < 0:
+                        break
+                    length = _content_length(buffer[:header_end])
+                    body_start = header_end + 4
+                    if len(buffer) < body_start + length:
+                        break
+                    body = bytes(buffer[body_start:body_start + length])
+                    del buffer[:body_start + length]
+                    self._dispatch(json.loads(body))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Ошибка чтения ответа LSP]: {e}")
+            self._fail_pending(e if isinstance(e, ConnectionError) else ConnectionError(str(e)))
+            await self.stop()
 
-            header_text = header.decode('utf-8')
-            headers = dict(
-                line.split(": ", 1)
-                for line in header_text.split("\r\n")
-                if ": " in line
-            )
+    async def _drain_stderr(self):
+        # Непрочитанный stderr заполнит канал, и сервер встанет на записи в лог
+        stderr = self.process.stderr
+        while await stderr.read(READ_CHUNK):
+            pass
+
+    def _dispatch(self, message):
+        if "method" not in message:
+            future = self._pending.get(message.get("id"))
+            if future is None or future.done():
+                return  # ответ на отменённый запрос
+            error = message.get("error")
+            if error:
+                future.set_exception(LSPError(error.get("code"), error.get("message"), error.get("data")))
+            else:
+                future.set_result(message.get("result"))
+        elif "id" in message:
+            asyncio.create_task(self._answer(message))
+        else:
+            for handler in self._notification_handlers.get(message["method"], ()):
+                self._call(handler, message.get("params"))
 
-            content_length = int(headers.get("Content-Length", 0))
-            body = await self.process.stdout.readexactly(content_length)
+    async def _answer(self, message):
+        handler = self._request_handlers.get(message["method"])
+        reply = {"jsonrpc": "2.0", "id": message["id"]}
+        if handler is None:
+            reply["error"] = {"code": METHOD_NOT_FOUND, "message": f"Не поддерживается: {message['method']}"}
+        else:
+            try:
+                result = handler(message.get("params"))
+                if inspect.isawaitable(result):
+                    result = await result
+                reply["result"] = result
+            except Exception as e:
+                reply["error"] = {"code": INTERNAL_ERROR, "message": str(e)}
+        await self.send(reply)
 
-            return json.loads(body.decode('utf-8'))
+    def _call(self, handler, params):
+        try:
+            result = handler(params)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
         except Exception as e:
-            print(f"[Ошибка чтения ответа LSP]: {e}")
-            await self.stop()
-            return None
+            print(f"[Ошибка обработчика LSP]: {e}")
+
+    def _store_diagnostics(self, params):
+        # Индекс строится здесь, в потоке цикла; GUI получает готовый
+        self.diagnostics[params["uri"]] = DiagnosticIndex.from_lsp(params.get("diagnostics", []))
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+
+def _content_length(header):
+    for line in bytes(header).split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            return int(value)
+    raise ValueError("Нет заголовка Content-Length")
+
+
+def _message(message, params):
+    # Запросы без параметров (shutdown, exit) не должны нести "params": null
+    if params is not None:
+        message["params"] = params
+    return message
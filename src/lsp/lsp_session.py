@@ -0,0 +1,175 @@
+from PyQt6.QtCore import QObject, QTimer
+
+from src.io_loop.io_loop import io_loop
+from src.lsp.document_sync import DocumentSync
+from src.lsp.lsp_client import LSPClient, LSPError
+
+PYTHON_SERVER = ['pylsp']
+DIAGNOSTICS_DELAY_MS = 16  # не чаще одного обновления за кадр
+SEMANTIC_DELAY_MS = 300     # семантические токены — после паузы в наборе
+
+
+class LSPSession(QObject):
+    """Языковой сервер проекта и синхронизация открытых в нём редакторов.
+
+    Сервер запускается при первом открытом файле. Пока идёт initialize,
+    редакторы ждут в очереди; если сервера нет, сессия просто молчит.
+    Все вызовы LSPClient уходят в поток io_loop.
+    """
+
+    def __init__(self, command=PYTHON_SERVER, parent=None):
+        super().__init__(parent)
+        self.client = LSPClient(command)
+        self.root = None
+        self.state = "stopped"  # stopped, starting, ready, failed
+        self._waiting = []
+        self._syncs = {}  # редактор -> DocumentSync
+        self._changed_uris = set()
+
+        # Линтеры шлют publishDiagnostics пачками (pyflakes, pycodestyle, ...)
+        self._diagnostics_timer = QTimer(self)
+        self._diagnostics_timer.setSingleShot(True)
+        self._diagnostics_timer.setInterval(DIAGNOSTICS_DELAY_MS)
+        self._diagnostics_timer.timeout.connect(self._apply_diagnostics)
+        self.client.on_notification("textDocument/publishDiagnostics", self._on_diagnostics)
+
+        self._semantic_pending = set()   # редакторы, ждущие запроса токенов
+        self._semantic_running = set()   # редакторы с запросом в полёте
+        self._semantic_resync = set()    # редакторы, пропустившие ответ
+        self._semantic_timer = QTimer(self)
+        self._semantic_timer.setSingleShot(True)
+        self._semantic_timer.setInterval(SEMANTIC_DELAY_MS)
+        self._semantic_timer.timeout.connect(self._request_semantic_tokens)
+
+    def open(self, editor, root):
+        if not editor.file_path or self.state == "failed":
+            return
+        if DocumentSync.language_for(editor.file_path) != 'python':
+            return
+        if self.state == "ready":
+            self._attach(editor)
+            return
+        self._waiting.append(editor)
+        if self.state == "stopped":
+            self.state = "starting"
+            self.root = root
+            io_loop.submit(self._start(), self._on_started)
+
+    def close(self, editor):
+        if editor in self._waiting:
+            self._waiting.remove(editor)
+        self._semantic_pending.discard(editor)
+        self._semantic_running.discard(editor)
+        self._semantic_resync.discard(editor)
+        sync = self._syncs.pop(editor, None)
+        if sync is not None:
+            sync.close()
+            self.client.diagnostics.pop(sync.uri, None)
+
+    def _on_diagnostics(self, params):
+        # Поток io_loop: клиент уже сохранил индекс, GUI только узнаёт об этом
+        io_loop.call_in_gui(self._diagnostics_changed, params["uri"])
+
+    def _diagnostics_changed(self, uri):
+        self._changed_uris.add(uri)
+        if not self._diagnostics_timer.isActive():
+            self._diagnostics_timer.start()
+
+    def _apply_diagnostics(self):
+        changed, self._changed_uris = self._changed_uris, set()
+        for editor, sync in self._syncs.items():
+            if sync.uri in changed:
+                editor.set_diagnostics(self.client.diagnostics.get(sync.uri))
+
+    def _schedule_semantic_tokens(self, editor):
+        self._semantic_pending.add(editor)
+        # Перезапуск: пока пользователь печатает, сервер не дёргаем
+        self._semantic_timer.start()
+
+    def _request_semantic_tokens(self):
+        pending, self._semantic_pending = self._semantic_pending, set()
+        for editor in pending:
+            sync = self._syncs.get(editor)
+            if sync is None:
+                continue
+            if editor in self._semantic_running:
+                self._semantic_pending.add(editor)  # спросим, когда придёт текущий ответ
+                continue
+            self._semantic_running.add(editor)
+            resync = editor in self._semantic_resync
+            self._semantic_resync.discard(editor)
+            state = (sync.version, editor.document().blockCount())
+            io_loop.submit(self._fetch_semantic_tokens(sync.uri, resync),
+                           lambda result, editor=editor, state=state:
+                           self._on_semantic_tokens(editor, state, result))
+
+    async def _fetch_semantic_tokens(self, uri, all_rows):
+        try:
+            return await self.client.request_semantic_tokens(uri, all_rows)
+        except (LSPError, ConnectionError) as e:
+            print(f"[LSP]: Семантические токены недоступны: {e}")
+            return None
+
+    def _on_semantic_tokens(self, editor, state, result):
+        self._semantic_running.discard(editor)
+        sync = self._syncs.get(editor)
+        if sync is None:
+            return
+        version, block_count = state
+        if sync.version != version:
+            # Пока шёл запрос, текст поменялся: следующий ответ поправит
+            # изменённые строки
+            self._schedule_semantic_tokens(editor)
+            if result is not None and editor.document().blockCount() != block_count:
+                # Строки сдвинулись — окно этого ответа применять нельзя, а
+                # сервер его больше не пришлёт: в следующий раз берём все строки
+                self._semantic_resync.add(editor)
+                result = None
+        if result is not None:
+            editor.highlighter.apply_semantic_tokens(*result)
+        if self._semantic_pending and not self._semantic_timer.isActive():
+            self._semantic_timer.start()
+
+    def shutdown(self, timeout=2.0):
+        if self.state != "ready":
+            return
+        self.state = "stopped"
+        future = io_loop.submit(self.client.shutdown())
+        try:
+            future.result(timeout)
+        except Exception as e:
+            print(f"[LSP]: Сервер не завершился вовремя: {e!r}")
+
+    async def _start(self):
+        await self.client.start()
+        if not self.client.is_running:
+            return None
+        try:
+            return await self.client.initialize(self.root)
+        except (LSPError, ConnectionError) as e:
+            print(f"[LSP]: initialize не удался: {e}")
+            await self.client.stop()
+            return None
+
+    def _on_started(self, capabilities):
+        if capabilities is None:
+            self.state = "failed"
+            self._waiting.clear()
+            return
+        self.state = "ready"
+        waiting, self._waiting = self._waiting, []
+        for editor in waiting:
+            self._attach(editor)
+
+    def _attach(self, editor):
+        if editor in self._syncs:
+            return
+        path = editor.file_path
+        sync = DocumentSync(self.client, editor.document(), path, DocumentSync.language_for(path),
+                            schedule=io_loop.submit, parent=editor)
+        self._syncs[editor] = sync
+        legend = self.client.semantic_legend()
+        if legend is not None:
+            editor.highlighter.set_semantic_legend(*legend)
+            sync.changed.connect(lambda editor=editor: self._schedule_semantic_tokens(editor))
+            self._schedule_semantic_tokens(editor)
@@ -0,0 +1,120 @@
+from array import array
+
+
+class SemanticTokens:
+    """Семантические токены одного документа в формате LSP.
+
+    ``data`` — плоский array('I') по пять чисел на токен: сдвиг строки,
+    сдвиг начала (от предыдущего токена на той же строке), длина, тип и
+    модификаторы. Ответ delta правит этот массив на месте, без разбора
+    всего документа; наружу отдаются только строки из изменившегося окна.
+
+    set_full и apply_delta возвращают None, если ничего не поменялось,
+    или (first_line, last_line, rows): rows — {строка: ((начало, длина,
+    тип, модификаторы), ...)}, строки окна без токенов идут с пустым
+    кортежем. last_line равен None, если окно доходит до конца документа.
+    """
+
+    def __init__(self):
+        self.data = array('I')
+        self.result_id = None
+
+    def set_full(self, result):
+        old = self.data
+        new = array('I', result.get("data", ()))
+        self.data = new
+        self.result_id = result.get("resultId")
+        prefix = _common_prefix(old, new)
+        if prefix == len(old) == len(new):
+            return None
+        suffix = _common_suffix(old, new, prefix)
+        return self._changed(prefix, len(new) - suffix, old, len(old) - suffix)
+
+    def apply_delta(self, result):
+        edits = sorted(result.get("edits", ()), key=lambda e: e["start"])
+        self.result_id = result.get("resultId")
+        if not edits:
+            return None
+        old = self.data
+        new = array('I')
+        position = 0
+        for edit in edits:
+            new += old[position:edit["start"]]
+            new.extend(edit.get("data", ()))
+            position = edit["start"] + edit["deleteCount"]
+        new += old[position:]
+        self.data = new
+        end = position + len(new) - len(old)  # конец правок в новом массиве
+        return self._changed(edits[0]["start"], end, old, position)
+
+    def all_rows(self):
+        return self._changed(0, len(self.data))
+
+    def _changed(self, start, end, old=None, old_end=0):
+        """Строки, задетые заменой чисел old[start:old_end] на data[start:end].
+
+        Окно доходит до первого токена после правки; если он оказался на
+        другой строке, чем в старом массиве, — до конца документа.
+        """
+        data = self.data
+        count = len(data) // 5
+        if not count:
+            return 0, None, {}
+        # Начало токена считается от предыдущего на той же строке, поэтому
+        # окно захватывает строку перед правкой и первый токен после неё
+        first = min(max(0, start // 5 - 1), count - 1)
+        while first > 0 and data[5 * first] == 0:
+            first -= 1
+        last = -(-end // 5)
+        if last < count and old is not None:
+            # Строки хранятся приращениями: если правка поменяла их сумму,
+            # все токены после неё, даже с теми же числами, стоят на других
+            # строках, и старые строки нужно очистить до конца документа
+            if sum(data[0:5 * last + 1:5]) != sum(old[0:-(-old_end // 5) * 5 + 1:5]):
+                last = count
+        if last >= count:
+            last = None
+            stop = count
+        else:
+            # Строка последнего токена может продолжаться дальше окна
+            stop = last + 1
+            while stop < count and data[5 * stop] == 0:
+                stop += 1
+
+        line = sum(data[0:5 * first + 1:5])
+        # С начала массива: у удалённых первых токенов строки могли быть выше
+        first_line = line if first else 0
+        rows = {}
+        character = 0
+        for offset in range(5 * first, 5 * stop, 5):
+            if offset > 5 * first and data[offset]:
+                line += data[offset]
+                character = 0
+            character += data[offset + 1]
+            rows.setdefault(line, []).append((character, data[offset + 2], data[offset + 3], data[offset + 4]))
+        result = {n: () for n in range(first_line, line + 1)}
+        result.update((n, tuple(tokens)) for n, tokens in rows.items())
+        return first_line, None if last is None else line, result
+
+
+def _common_prefix(a, b):
+    # Сравнение срезов идёт в C; двоичный поиск вместо цикла по числам
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a, b, prefix):
+    low, high = 0, min(len(a), len(b)) - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -1,4 +1,3 @@
-import asyncio
 import os
 import sys
 import json
@@ -8,6 +7,13 @@ from PyQt6.QtGui import *
 from pathlib import Path
 from src.customization.themes import DARK_THEME, LIGHT_THEME
 from src.editor.editor import CodeEditor
+from src.editor.lexer_registry import lexer_registry
+from src.editor.completion_worker import completion_worker
+from src.editor.jedi_projects import project_cache
+from src.formatter.format_worker import format_worker
+from src.formatter.project_formatter import project_formatter
+from src.io_loop.io_loop import io_loop
+from src.lsp.lsp_session import LSPSession
 from src.file_manager.file_manager import FileExplorer
 from src.terminal.terminal import WindowsTerminal
 from src.main_window.title_bar import TitleBar
@@ -27,11 +33,15 @@ class MainWindow(QMainWindow):
         self.recent_projects_menu = None
         self.debugger_panel = DebuggerWidget()
         self.debugger_panel.hide()
-        self.dap_client = None  
-        self.debug_launcher = None
+        self.lsp = LSPSession(parent=self)
+        QCoreApplication.instance().aboutToQuit.connect(self.shutdown_services)
 
+        # Таблицы лексеров строим в фоне, пока поднимается окно
+        lexer_registry.warm_up()
         self.load_recent_projects()
         self.init_ui()
+        # Пока пользователь осматривается, jedi разбирает популярные импорты проекта
+        completion_worker.preload(self.file_explorer.root_path)
 
     def init_ui(self):
         self.setWindowIcon(QIcon("src/ico.png"))
@@ -90,6 +100,11 @@ class MainWindow(QMainWindow):
         format_action.triggered.connect(self.format_current_file)
         edit_menu.addAction(format_action)
 
+        format_project_action = QAction("Format Project", self)
+        format_project_action.setShortcut("Ctrl+Alt+Shift+F")
+        format_project_action.triggered.connect(self.format_project)
+        edit_menu.addAction(format_project_action)
+
         toggle_theme_action = QAction("Toggle Theme", self)
         toggle_theme_action.triggered.connect(self.toggle_theme)
         options_menu.addAction(toggle_theme_action)
@@ -165,6 +180,7 @@ class MainWindow(QMainWindow):
     def setup_sidebar(self, layout):
         self.file_explorer = FileExplorer(
             file_open_callback=self.load_file_to_editor)
+        self.file_explorer.root_changed.connect(completion_worker.preload)
         layout.addWidget(self.file_explorer)
 
     def toggle_sidebar(self):
@@ -179,9 +195,8 @@ class MainWindow(QMainWindow):
 
     def new_file(self):
         editor = CodeEditor(file_path=None)
-        editor.original_text = ""
-        editor.document().contentsChanged.connect(
-            lambda ed=editor: self.update_tab_title(ed))
+        editor.dirty_tracker.dirty_changed.connect(
+            lambda dirty, ed=editor: self.update_tab_title(ed))
         index = self.tab_view.addTab(editor, "New File")
         self.tab_view.setCurrentIndex(index)
         self.tab_files[index] = None
@@ -193,6 +208,7 @@ class MainWindow(QMainWindow):
         if file_path:
             project_dir = os.path.dirname(file_path)
             self.add_recent_project(project_dir)
+            completion_worker.preload(project_cache.root_for(file_path))
             self.load_file_to_editor(file_path)
 
     def open_file_from_tree(self, index):
@@ -209,11 +225,11 @@ class MainWindow(QMainWindow):
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             editor = CodeEditor(file_path=file_path)
-            editor.document().contentsChanged.connect(
-                lambda editor=editor: self.update_tab_title(editor))
-            editor.original_text = content
             editor.setPlainText(content)
-            editor.set_lexer_by_filename(file_path)
+            editor.dirty_tracker.mark_saved(content)
+            editor.dirty_tracker.dirty_changed.connect(
+                lambda dirty, editor=editor: self.update_tab_title(editor))
+            self.lsp.open(editor, self.file_explorer.root_path)
             index = self.tab_view.addTab(editor, Path(file_path).name)
             self.tab_view.setCurrentIndex(index)
             self.tab_files[index] = file_path
@@ -254,14 +270,15 @@ class MainWindow(QMainWindow):
             current_index = self.tab_view.currentIndex()
             editor = self.tab_view.widget(current_index)
             if isinstance(editor, CodeEditor):
-                editor.original_text = content  # сохраняем текущее состояние как "неизменное"
-                self.update_tab_title(editor)
+                editor.dirty_tracker.mark_saved(content)  # сохраняем текущее состояние как "неизменное"
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Cannot save file: {str(e)}")
 
     def close_tab(self, index):
         widget = self.tab_view.widget(index)
         if widget:
+            if isinstance(widget, CodeEditor):
+                self.lsp.close(widget)
             widget.deleteLater()
         if index in self.tab_files:
             del self.tab_files[index]
@@ -271,8 +288,14 @@ class MainWindow(QMainWindow):
 
     def exit_app(self):
         QCoreApplication.quit()
-        loop = asyncio.get_event_loop()
-        loop.stop()
+
+    def shutdown_services(self):
+        # aboutToQuit: сюда приходит и Exit из меню, и кнопка закрытия в заголовке
+        format_worker.shutdown()
+        project_formatter.cancel()
+        self.lsp.shutdown()
+        self.debugger_panel.stop_all()
+        io_loop.stop()
 
     def toggle_transparency(self):
         current_opacity = self.windowOpacity()
@@ -361,6 +384,52 @@ class MainWindow(QMainWindow):
         if isinstance(editor, CodeEditor):
             editor.format_code()
 
+    def format_project(self):
+        if project_formatter.is_running():
+            return
+        root = os.path.abspath(self.file_explorer.root_path)
+        # Открытые файлы форматируем в редакторе: запись на диск
+        # разошлась бы с буфером, а правки остались бы без undo
+        open_paths = set()
+        for i in range(self.tab_view.count()):
+            editor = self.tab_view.widget(i)
+            if isinstance(editor, CodeEditor) and editor.file_path:
+                path = os.path.abspath(editor.file_path)
+                if path.startswith(root + os.sep) and path.endswith(('.py', '.pyw', '.pyi')):
+                    open_paths.add(path)
+                    editor.format_code()
+
+        dialog = QProgressDialog("Formatting project...", "Cancel", 0, 0, self)
+        dialog.setWindowTitle("Format Project")
+        dialog.setMinimumDuration(500)  # повторный прогон по кэшу окно не показывает
+        dialog.canceled.connect(project_formatter.cancel)
+
+        def on_progress(done, total, path):
+            dialog.setValue(done)
+            dialog.setLabelText(os.path.relpath(path, root))
+
+        def on_finished(changed, cached, errors, cancelled):
+            for signal, slot in ((project_formatter.started, dialog.setMaximum),
+                                 (project_formatter.progress, on_progress),
+                                 (project_formatter.finished, on_finished)):
+                signal.disconnect(slot)
+            dialog.reset()
+            dialog.deleteLater()
+            summary = (f"Format Project{' cancelled' if cancelled else ''}: {changed} changed, "
+                       f"{cached} unchanged (cached), {len(errors)} failed")
+            self.statusBar().showMessage(summary, 10000)
+            if errors:
+                box = QMessageBox(QMessageBox.Icon.Warning, "Format Project",
+                                  f"{len(errors)} file(s) could not be formatted.", parent=self)
+                box.setDetailedText("\n".join(f"{os.path.relpath(path, root)}: {message}"
+                                              for path, message in errors))
+                box.exec()
+
+        project_formatter.started.connect(dialog.setMaximum)
+        project_formatter.progress.connect(on_progress)
+        project_formatter.finished.connect(on_finished)
+        project_formatter.start(root, skip=open_paths)
+
     def update_tab_title(self, editor):
         index = self.tab_view.indexOf(editor)
         if index == -1:
@@ -368,8 +437,7 @@ class MainWindow(QMainWindow):
 
         file_name = os.path.basename(
             editor.file_path) if editor.file_path else "New File"
-        current_text = editor.toPlainText()
-        is_modified = current_text != editor.original_text
+        is_modified = editor.dirty_tracker.is_dirty
 
         if is_modified:
             self.tab_view.setTabText(index, f"{file_name}*")
@@ -390,29 +458,26 @@ class MainWindow(QMainWindow):
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
         editor.setPlainText(content)
-        editor.set_lexer_by_filename(file_path)
+        editor.dirty_tracker.mark_saved(content)
+        editor.dirty_tracker.dirty_changed.connect(
+            lambda dirty, editor=editor: self.update_tab_title(editor))
+        self.lsp.open(editor, self.file_explorer.root_path)
 
         filename = os.path.basename(file_path)
         self.tab_view.addTab(editor, filename)
         self.tab_view.setCurrentWidget(editor)
     
     def start_debugging(self):
-        if self.dap_client or (self.debug_launcher and self.debug_launcher.is_running()):
-            self.debug_output.append("[Предупреждение] Отладка уже запущена.")
-            return
         current_index = self.tab_view.currentIndex()
         if current_index == -1:
             return
-        current_index = self.tab_view.currentIndex()
         editor = self.tab_view.widget(current_index)
 
         if not isinstance(editor, CodeEditor) or not editor.file_path:
             QMessageBox.warning(self, "Ошибка", "Файл не сохранён или не является Python-файлом.")
             return
 
-        if self.debugger_panel.isVisible():
-            self.debugger_panel.hide()
-        else:
-            self.debugger_panel.set_current_editor(editor)
-            self.debugger_panel.show()
-            self.debugger_panel.start_debugging()  # <<< Запуск отладки
\ No newline at end of file
+        # Каждый запуск — отдельная сессия на своём порту
+        self.debugger_panel.set_current_editor(editor)
+        self.debugger_panel.show()
+        self.debugger_panel.start_debugging()  # <<< Запуск отладки
\ No newline at end of file
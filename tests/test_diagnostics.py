@@ -0,0 +1,58 @@
+import random
+
+from src.lsp.diagnostics import ERROR, WARNING, DiagnosticIndex
+
+
+def moved(line, edit_line, delta):
+    """Где окажется строка ``line`` после вставки/удаления строк за ``edit_line``."""
+    if line <= edit_line:
+        return line
+    if delta < 0 and line <= edit_line - delta:
+        return edit_line
+    return line + delta
+
+
+def test_from_lsp_splits_single_and_multi_line():
+    index = DiagnosticIndex.from_lsp([
+        {"range": {"start": {"line": 2, "character": 1}, "end": {"line": 2, "character": 4}},
+         "severity": WARNING, "message": "unused"},
+        {"range": {"start": {"line": 5, "character": 0}, "end": {"line": 8, "character": 1}},
+         "message": "unclosed"},
+    ])
+    assert len(index) == 2
+    assert index.in_lines(2, 2) == [(2, 1, 2, 4, WARNING, "unused")]
+    assert index.in_lines(7, 7) == [(5, 0, 8, 1, ERROR, "unclosed")]
+    assert index.in_lines(3, 4) == []
+
+
+def test_insert_and_delete_shift_lines():
+    index = DiagnosticIndex([(3, 0, 3, 1, ERROR, "a"), (10, 0, 10, 1, ERROR, "b")])
+    inserted = index.shifted(5, 2)
+    assert inserted.in_lines(0, 100) == [(3, 0, 3, 1, ERROR, "a"), (12, 0, 12, 1, ERROR, "b")]
+    # Строки 6..10 удалены: диагностика с них прижимается к строке 5
+    deleted = index.shifted(5, -5)
+    assert deleted.in_lines(5, 5) == [(5, 0, 5, 1, ERROR, "b")]
+    # Сдвиг возвращает новый индекс, прежний не меняется
+    assert index.in_lines(10, 10) == [(10, 0, 10, 1, ERROR, "b")]
+
+
+def test_random_shifts_match_moving_every_item():
+    rnd = random.Random(19)
+    for _ in range(200):
+        items = []
+        for n in range(rnd.randint(0, 30)):
+            line = rnd.randint(0, 50)
+            end = line + (rnd.randint(1, 4) if rnd.random() < 0.2 else 0)
+            items.append((line, 0, end, 1, ERROR, str(n)))
+        index = DiagnosticIndex(items)
+        # Больше MAX_EDITS сдвигов проверяет и сворачивание их в новый индекс
+        for _ in range(rnd.randint(1, DiagnosticIndex.MAX_EDITS + 10)):
+            edit_line, delta = rnd.randint(0, 60), rnd.choice([-3, -1, 1, 2, 5])
+            index = index.shifted(edit_line, delta)
+            items = [(moved(d[0], edit_line, delta), d[1], moved(d[2], edit_line, delta)) + d[3:]
+                     for d in items]
+        for _ in range(10):
+            first = rnd.randint(0, 80)
+            last = first + rnd.randint(0, 10)
+            expected = sorted(d for d in items if d[0] <= last and d[2] >= first)
+            assert sorted(index.in_lines(first, last)) == expected
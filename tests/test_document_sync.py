@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from src.lsp.document_sync import _line_change
+from src.lsp.lsp_client import TEXT_SYNC_INCREMENTAL
+
+
+def offset(lines, position):
+    """Позиция LSP (строка, символ в UTF-16) -> индекс в '\\n'.join(lines)."""
+    before = sum(len(line) + 1 for line in lines[:position["line"]])
+    units = lines[position["line"]].encode('utf-16-le', 'surrogatepass')[:2 * position["character"]]
+    return before + len(units.decode('utf-16-le', 'surrogatepass'))
+
+
+def apply(old, change):
+    text = '\n'.join(old)
+    start = offset(old, change["range"]["start"])
+    end = offset(old, change["range"]["end"])
+    assert start <= end
+    return text[:start] + change["text"] + text[end:]
+
+
+@pytest.mark.parametrize("old, new", [
+    (["bb", "b"], ["b"]),
+    (["b"], ["bb", "b"]),
+    (["abc"], ["abxc"]),
+    (["a", "b", "c"], ["a", "c"]),
+    (["a", "c"], ["a", "b", "c"]),
+    (["😀x"], ["😀yx"]),
+    (["𝔘😀", "é"], ["𝔘😀", "éé"]),
+    (["aa", "aa"], ["aa"]),
+    ([""], ["x"]),
+])
+def test_change_reproduces_new_lines(old, new):
+    assert apply(old, _line_change(0, old, new)) == '\n'.join(new)
+
+
+def test_typing_one_character_sends_one_character():
+    change = _line_change(7, ["def f(self):"], ["def fo(self):"])
+    assert change == {
+        "range": {"start": {"line": 7, "character": 5}, "end": {"line": 7, "character": 5}},
+        "text": "o",
+    }
+
+
+def test_columns_are_counted_in_utf16():
+    change = _line_change(0, ["😀a"], ["😀b"])
+    assert change["range"]["start"] == {"line": 0, "character": 2}
+    assert change["range"]["end"] == {"line": 0, "character": 3}
+
+
+def test_random_changes():
+    rnd = random.Random(17)
+    alphabet = ["a", "b", "😀", ""]
+    for _ in range(3000):
+        old = ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 3)))
+               for _ in range(rnd.randint(1, 4))]
+        new = ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 3)))
+               for _ in range(rnd.randint(1, 4))]
+        change = _line_change(0, old, new)
+        assert apply(old, change) == '\n'.join(new), (old, new)
+
+
+class RecordingClient:
+    """Клиент, который вместо отправки запоминает didChange."""
+
+    is_running = True
+
+    def __init__(self):
+        self.changes = []
+
+    def text_sync_kind(self):
+        return TEXT_SYNC_INCREMENTAL
+
+    def did_open(self, uri, language_id, version, text):
+        return None
+
+    def did_change(self, uri, version, changes):
+        self.changes.extend(changes)
+
+    def did_close(self, uri):
+        return None
+
+
+def test_document_edits_replay_on_server_copy(qapp):
+    from PyQt6.QtGui import QTextCursor
+    from PyQt6.QtWidgets import QPlainTextEdit
+
+    from src.lsp.document_sync import DocumentSync
+
+    editor = QPlainTextEdit()
+    editor.setPlainText("import os\n😀 = 1\n\nprint(😀)")
+    client = RecordingClient()
+    sync = DocumentSync(client, editor.document(), "/tmp/x.py", schedule=lambda coroutine: None)
+    server = editor.toPlainText().split('\n')
+
+    rnd = random.Random(20)
+    for _ in range(200):
+        cursor = QTextCursor(editor.document())
+        length = editor.document().characterCount() - 1
+        start = rnd.randint(0, length)
+        cursor.setPosition(start)
+        cursor.setPosition(min(length, start + rnd.randint(0, 6)), QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(rnd.choice(["x", "😀", "\n", "\nif 𝔘:\n", ""]))
+        sync.flush()
+        for change in client.changes:
+            server = apply(server, change).split('\n')
+        client.changes.clear()
+        assert '\n'.join(server) == editor.toPlainText()
@@ -0,0 +1,50 @@
+from src.editor.fuzzy_ranker import FuzzyIndex, RecentNames, char_mask, humps
+
+
+def ranked(index, query):
+    return [index.names[i] for i in index.filter(query)]
+
+
+def make_index(names, recent=None):
+    index = FuzzyIndex(recent if recent is not None else RecentNames())
+    index.set_candidates(names)
+    return index
+
+
+def test_humps():
+    assert humps("getValueOf") == "gvo"
+    assert humps("read_csv") == "rc"
+    assert humps("__init__") == "_i"
+
+
+def test_char_mask_ignores_case():
+    assert char_mask("Abc") == char_mask("cba")
+    assert char_mask("ab") & char_mask("abc") == char_mask("ab")
+
+
+def test_tiers():
+    index = make_index(["Reader", "read_csv", "re_compile", "thread", "rxexd", "other"])
+    # Префикс с регистром, без регистра, горбы, подстрока, подпоследовательность
+    assert ranked(index, "re") == ["read_csv", "re_compile", "Reader", "thread", "rxexd"]
+    assert ranked(index, "rc") == ["read_csv", "re_compile"]
+    assert ranked(index, "red") == ["rxexd", "Reader", "thread", "read_csv"]
+
+
+def test_shorter_candidates_first_within_tier():
+    index = make_index(["values", "value", "val"])
+    assert ranked(index, "va") == ["val", "value", "values"]
+
+
+def test_narrowed_query_matches_fresh_query():
+    names = ["append", "apply", "map", "zip", "capital", "paragraph", "sleep", "a_p_p"]
+    index = make_index(names)
+    for query in ["a", "ap", "app", "appl"]:
+        assert ranked(index, query) == ranked(make_index(names), query)
+
+
+def test_recent_names_move_up_in_their_tier():
+    recent = RecentNames()
+    index = make_index(["path", "pardir", "pathsep"], recent)
+    recent.note("pathsep")
+    assert ranked(index, "pa") == ["pathsep", "path", "pardir"]
+    assert ranked(index, "") == ["path", "pardir", "pathsep"]
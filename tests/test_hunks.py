@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from src.formatter.hunks import line_hunks
+
+
+def apply_utf16(text, hunks):
+    """Применить правки, как QTextDocument: позиции в единицах UTF-16."""
+    units = text.encode('utf-16-le', 'surrogatepass')
+    for start, end, replacement in reversed(hunks):
+        units = units[:2 * start] + replacement.encode('utf-16-le', 'surrogatepass') + units[2 * end:]
+    return units.decode('utf-16-le', 'surrogatepass')
+
+
+@pytest.mark.parametrize("old, new", [
+    ("a\nb\nc", "a\nB\nc"),
+    ("x = '😀'\ny=1\n", "x = '😀'\ny = 1\n"),
+    ("😀😀\n𝔘\nz", "😀😀\n𝔘\nZ"),
+    ("a\nb", "a\nb\nc"),
+    ("a\nb\nc", "a"),
+    ("a\nb\n", "a\nb"),
+    ("", "import os\n"),
+    ("import os\n", ""),
+    ("a", "a"),
+])
+def test_round_trip(old, new):
+    assert apply_utf16(old, line_hunks(old, new)) == new
+
+
+def test_unchanged_text_has_no_hunks():
+    assert line_hunks("a\n😀\n", "a\n😀\n") == []
+
+
+def test_positions_count_astral_characters_twice():
+    # '😀' — две единицы UTF-16, так что вторая строка начинается с 3
+    assert line_hunks("😀\nb", "😀\nc") == [(3, 4, "c")]
+
+
+def test_random_round_trip():
+    rnd = random.Random(14)
+    alphabet = ["a", "b", " ", "😀", "𝔘", "é"]
+    for _ in range(1000):
+        lines = ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 3)))
+                 for _ in range(rnd.randint(0, 6))]
+        new_lines = list(lines)
+        for _ in range(rnd.randint(1, 3)):
+            action = rnd.random()
+            position = rnd.randint(0, len(new_lines))
+            if action < 0.4:
+                new_lines.insert(position, rnd.choice(alphabet))
+            elif action < 0.7 and new_lines:
+                del new_lines[min(position, len(new_lines) - 1)]
+            elif new_lines:
+                new_lines[min(position, len(new_lines) - 1)] += rnd.choice(alphabet)
+        old, new = "\n".join(lines), "\n".join(new_lines)
+        if rnd.random() < 0.5:
+            old += "\n"
+        if rnd.random() < 0.5:
+            new += "\n"
+        assert apply_utf16(old, line_hunks(old, new)) == new, (old, new)
+
+
+def test_hunks_apply_to_qt_document(qapp):
+    from PyQt6.QtGui import QTextCursor
+    from PyQt6.QtWidgets import QPlainTextEdit
+
+    old = "s = '😀'\nif x :\n    pass\n𝔘 = 1"
+    new = "s = '😀'\nif x:\n    pass\n𝔘 = 1\n"
+    editor = QPlainTextEdit()
+    editor.setPlainText(old)
+    cursor = QTextCursor(editor.document())
+    for start, end, text in reversed(line_hunks(old, new)):
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(text)
+    assert editor.toPlainText() == new
@@ -0,0 +1,96 @@
+import random
+
+from src.lsp.semantic_tokens import SemanticTokens
+
+
+def decode(data):
+    """{строка: ((начало, длина, тип, модификаторы), ...)} без пустых строк."""
+    rows = {}
+    line = character = 0
+    for offset in range(0, len(data), 5):
+        if data[offset]:
+            line += data[offset]
+            character = 0
+        character += data[offset + 1]
+        rows.setdefault(line, []).append(tuple([character]) + tuple(data[offset + 2:offset + 5]))
+    return {n: tuple(tokens) for n, tokens in rows.items()}
+
+
+def apply_window(rows, window):
+    """Обновить строки так же, как подсветчик по окну из set_full/apply_delta."""
+    if window is None:
+        return rows
+    first, last, changed = window
+    rows = {n: tokens for n, tokens in rows.items()
+            if n < first or (last is not None and n > last)}
+    rows.update((n, tokens) for n, tokens in changed.items() if tokens)
+    return rows
+
+
+def random_tokens(rnd):
+    data = []
+    for _ in range(rnd.randint(0, 8)):
+        data += [rnd.choice([0, 0, 1, 2]), rnd.randint(0, 4), rnd.randint(1, 3), rnd.randint(0, 2), 0]
+    if data:
+        data[0] = rnd.randint(0, 2)
+    return data
+
+
+def test_unchanged_full_result_is_none():
+    tokens = SemanticTokens()
+    tokens.set_full({"data": [0, 0, 3, 1, 0]})
+    assert tokens.set_full({"data": [0, 0, 3, 1, 0]}) is None
+
+
+def test_tokens_moved_between_lines_clear_old_line():
+    # self появился на строке 4 и пропал со строки 6, число строк то же
+    tokens = SemanticTokens()
+    old = [3, 8, 4, 1, 0, 2, 8, 4, 1, 0, 1, 8, 4, 1, 0]
+    new = [3, 8, 4, 1, 0, 1, 8, 4, 1, 0, 1, 8, 4, 1, 0]
+    rows = apply_window({}, tokens.set_full({"data": old}))
+    assert rows == decode(old)
+    rows = apply_window(rows, tokens.set_full({"data": new}))
+    assert rows == decode(new)
+
+
+def test_delta_splices_edits():
+    tokens = SemanticTokens()
+    tokens.set_full({"data": [0, 0, 3, 1, 0, 1, 4, 2, 1, 0], "resultId": "1"})
+    window = tokens.apply_delta({"resultId": "2", "edits": [{"start": 5, "deleteCount": 5,
+                                                            "data": [2, 1, 5, 3, 0]}]})
+    assert list(tokens.data) == [0, 0, 3, 1, 0, 2, 1, 5, 3, 0]
+    assert tokens.result_id == "2"
+    assert apply_window(decode([0, 0, 3, 1, 0, 1, 4, 2, 1, 0]), window) == decode(tokens.data)
+
+
+def test_random_full_results():
+    rnd = random.Random(20)
+    tokens = SemanticTokens()
+    rows = {}
+    for _ in range(3000):
+        data = random_tokens(rnd)
+        rows = apply_window(rows, tokens.set_full({"data": data}))
+        assert rows == decode(data), data
+
+
+def test_random_deltas():
+    rnd = random.Random(21)
+    for _ in range(2000):
+        tokens = SemanticTokens()
+        old = random_tokens(rnd)
+        rows = apply_window({}, tokens.set_full({"data": old}))
+        edits = []
+        position = 0
+        for _ in range(rnd.randint(1, 3)):
+            start = rnd.randrange(position, len(old) + 1, 5) if position <= len(old) else len(old)
+            delete = min(len(old) - start, 5 * rnd.randint(0, 2))
+            edits.append({"start": start, "deleteCount": delete, "data": random_tokens(rnd)[:10]})
+            position = start + delete + 5
+            if position > len(old):
+                break
+        expected = list(old)
+        for edit in reversed(edits):
+            expected[edit["start"]:edit["start"] + edit["deleteCount"]] = edit["data"]
+        rows = apply_window(rows, tokens.apply_delta({"edits": edits}))
+        assert list(tokens.data) == expected
+        assert rows == decode(expected), (old, edits)
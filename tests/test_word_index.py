@@ -0,0 +1,68 @@
+import random
+from collections import Counter
+
+from src.editor.word_index import _WORD_RE, DocumentWords, WordIndex
+
+
+def test_complete_by_prefix_ignoring_case():
+    index = WordIndex()
+    index.add(["Value", "values", "valid", "other", "values"])
+    # Частые выше, при равенстве — короче, затем по алфавиту
+    assert index.complete("val") == ["values", "valid", "Value"]
+    assert index.complete("VAL") == ["values", "valid", "Value"]
+    assert index.complete("x") == []
+
+
+def test_word_being_typed_is_not_offered_alone():
+    index = WordIndex()
+    index.add(["counter", "count"])
+    assert index.complete("count") == ["counter"]
+    index.add(["count"])
+    assert index.complete("count") == ["count", "counter"]
+
+
+def test_remove_drops_words_without_occurrences():
+    index = WordIndex()
+    index.add(["alpha", "alpha", "beta"])
+    index.remove(["alpha", "beta"])
+    assert index.complete("a") == ["alpha"]
+    assert index.complete("b") == []
+    assert len(index) == 1
+
+
+def test_bulk_add_and_remove():
+    index = WordIndex()
+    words = [f"name{i}" for i in range(WordIndex.BULK * 3)]
+    index.add(words)
+    assert len(index) == len(words)
+    index.remove(words[1:])
+    assert index.complete("name") == ["name0"]
+
+
+def test_document_words_follow_edits(qapp):
+    from PyQt6.QtGui import QColor, QTextCharFormat, QTextCursor
+    from PyQt6.QtWidgets import QPlainTextEdit
+
+    editor = QPlainTextEdit()
+    editor.setPlainText("\n".join(f"alpha{i} = beta + gamma_{i % 3}" for i in range(50)))
+    index = WordIndex()
+    words = DocumentWords(editor.document(), index, editor)
+
+    rnd = random.Random(13)
+    for _ in range(300):
+        cursor = QTextCursor(editor.document())
+        length = editor.document().characterCount() - 1
+        start = rnd.randint(0, length)
+        cursor.setPosition(start)
+        cursor.setPosition(min(length, start + rnd.choice([0, 1, 5, 40])), QTextCursor.MoveMode.KeepAnchor)
+        if rnd.random() < 0.3:
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor("red"))
+            cursor.mergeCharFormat(fmt)
+        else:
+            cursor.insertText(rnd.choice(["x", "delta epsilon", "\n", "\nzeta\n", ""]))
+
+    expected = Counter(_WORD_RE.findall(editor.toPlainText()))
+    assert index._counts == expected
+    assert index._sorted == sorted((word.lower(), word) for word in expected)
+    assert words._blocks == [tuple(_WORD_RE.findall(line)) for line in editor.toPlainText().split('\n')]